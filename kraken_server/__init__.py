@@ -6,6 +6,6 @@ call on the classes in the ``KrakenTools`` module.
 """
 
 
-from .kraken_process_manager_agent import KrakenProcessManagerAgent
-from .kraken_share_manager_agent import KrakenShareManagerAgent
+from .kraken_agent import KrakenAgent, RateLimited
 from .kraken_server import KrakenServer
+from .kraken_codecs import FastMsgPack, FastMsgPackBlosc
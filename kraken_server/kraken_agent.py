@@ -0,0 +1,259 @@
+"""Provides a class that RPC requests are made to.
+
+"""
+
+
+from kraken_tools import KrakenProcessManager, KrakenShareManager
+from .kraken_agent_tools import expose_delegate, expose_deferred
+from concurrent.futures import ThreadPoolExecutor
+import aiomas
+import asyncio
+import logging
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+class RateLimited(Exception):
+    """Raised when an RPC could not be admitted by the rate limit within the queue timeout.
+
+    """
+    pass
+
+
+class KrakenAgent(aiomas.Agent):
+    """Exposes ``KrakenProcessManager`` and ``KrakenShareManager`` methods for RPC.
+
+    Both managers are served by this single agent and share one rate limit. Calls over the rate
+    limit are queued for up to ``queue_timeout`` seconds, after which ``RateLimited`` is raised to
+    the caller. Exposed methods that only delegate to a manager are generated with
+    ``expose_delegate``. The process control methods also have ``_async`` variants generated with
+    ``expose_deferred``, which return as soon as the change is scheduled.
+
+    The share manager's digest is exposed as ``share_generate_digest``, as ``generate_digest``
+    returns the process digest.
+
+    Args:
+        container (aiomas.Container): The container the agent is using.
+        rate_limit (float, optional): The time interval required in seconds between calls of
+            exposed methods. Defaults to 0 (unlimited).
+        share_dir (str, optional): Path to the share folder for Kraken. Defaults to /milk/share.
+        burst_capacity (int, optional): The number of calls that can be made back to back before
+            rate limiting applies. Defaults to 1.
+        queue_timeout (float, optional): The longest time in seconds a call waits for the rate
+            limit before being rejected. Defaults to 1.0.
+        share_polling (bool, optional): If True, the share folder is polled for changes. Set to 
+            None to poll only if it is on a network file system. Defaults to None.
+        share_poll_interval (float, optional): The interval in seconds between polls of the share 
+            folder. Defaults to 2.0.
+
+    Attributes:
+        process_manager (KrakenProcessManager): The process manager.
+        share_manager (KrakenShareManager): The share manager.
+        rate_limit (float): The time interval required between calls of exposed methods.
+        capacity (int): The maximum number of tokens held for rate limiting.
+        tokens (float): The number of tokens currently available. Each call consumes one token.
+        refill_rate (float): The number of tokens regained per second.
+        last_refill (float): The last time the tokens were refilled. Used for rate limiting.
+        DIGEST_CACHE_INTERVAL (float): Class attribute. The interval in seconds for which a 
+            process digest is reused.
+        queue_timeout (float): The longest time in seconds a call waits for the rate limit.
+        digest_cache (tuple): The time bucket and ``digest_version`` of the last process digest, 
+            and the future holding it, or None.
+        share_digest_cache (tuple): The last generated share digest and the ``digest_version`` it
+            was generated at, or None.
+
+    """
+    DIGEST_CACHE_INTERVAL = 0.5
+
+    def __init__(self, container, rate_limit=0, share_dir="/milk/share", burst_capacity=1, queue_timeout=1.0, share_polling=None, share_poll_interval=2.0):
+        aiomas.Agent.__init__(self, container)
+        self.process_manager = KrakenProcessManager()
+        self.share_manager = KrakenShareManager(share_dir, polling=share_polling, poll_interval=share_poll_interval)
+        self.rate_limit = rate_limit
+        if rate_limit > 0:
+            log.info("Rate limiting activated, max 1 call per %s s, burst of %s", rate_limit, burst_capacity)
+        self.capacity = burst_capacity
+        self.tokens = float(burst_capacity)
+        self.refill_rate = 1.0 / rate_limit if rate_limit > 0 else 0.0
+        self.last_refill = time.monotonic()
+        self.queue_timeout = queue_timeout
+        self.digest_cache = None
+        self.share_digest_cache = None
+        if rate_limit <= 0:
+            # Specialise the wait away when rate limiting is disabled
+            self.acquire = self.acquire_unlimited
+
+    def dispose(self):
+        """Performs the shutdown sequence of both managers.
+
+        """
+        self.process_manager.dispose()
+        self.share_manager.dispose()
+
+    def start_tracking(self):
+        """Starts the trackers of both managers.
+
+        The initial scans are I/O bound, so both trackers are started concurrently.
+
+        Returns:
+            bool: True if both were successful, False if not.
+
+        """
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [
+                executor.submit(manager.start_tracking)
+                for manager in (self.process_manager, self.share_manager)
+            ]
+            return all([future.result() for future in futures])
+
+    def stop_tracking(self):
+        """Stops the trackers of both managers.
+
+        Returns:
+            bool: True if both were successful, False if not.
+
+        """
+        process_stopped = self.process_manager.stop_tracking()
+        share_stopped = self.share_manager.stop_tracking()
+        return process_stopped and share_stopped
+
+    async def acquire(self):
+        """Waits until a token is available to make a call.
+
+        Tokens are refilled at a rate of one per ``rate_limit`` interval, up to ``capacity``. A 
+        call that finds no token reserves the next one and sleeps until it is refilled, so queued 
+        calls are admitted in order. This method should be awaited in all exposed methods to rate 
+        limit their call rate. If rate limiting is disabled, this method is replaced on the 
+        instance by ``acquire_unlimited``.
+
+        Raises:
+            RateLimited: If the wait for a token would exceed ``queue_timeout``.
+
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate)
+        self.last_refill = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return
+
+        delay = -self.tokens / self.refill_rate
+        if delay > self.queue_timeout:
+            self.tokens += 1
+            log.warning("RPC was prevented by rate limiting.")
+            raise RateLimited("Rate limited, retry in {:.3f} s.".format(delay - self.queue_timeout))
+        await asyncio.sleep(delay)
+
+    async def acquire_unlimited(self):
+        """Admits a call immediately. Used in place of ``acquire`` when rate limiting is disabled.
+
+        """
+        pass
+
+    @aiomas.expose
+    async def process_batch(self, ops):
+        """Changes the control values for several groups of processes in a single call.
+
+        Only one rate limit check is made for the whole batch.
+
+        See Also:
+            :meth:`kraken_tools.kraken_process_manager.KrakenProcessManager.process_set_control`
+
+        Args:
+            ops (list): List of ``(control, filenames)`` pairs, where ``control`` is a
+                ``KrakenProcessCode.Control`` value and ``filenames`` is a list of linked shm
+                filepaths.
+
+        Raises:
+            RateLimited: If the call could not be admitted within the queue timeout.
+
+        Returns:
+            list: The return values of the base function for each pair.
+
+        """
+        log.debug("%r batch called.", self)
+        await self.acquire()
+        return [self.process_manager.process_set_control(control, filenames) for control, filenames in ops]
+
+    @aiomas.expose
+    async def generate_digest(self):
+        """Generates a digest containing statistics for all tracked processes.
+
+        The digest is generated in the event loop's default executor. It is reused by every call 
+        within the same ``DIGEST_CACHE_INTERVAL`` time bucket, including calls made while it is 
+        still being generated, unless processes or their control values change in between. A 
+        digest that fails is not reused.
+
+        See Also:
+            :meth:`kraken_tools.kraken_process_manager.KrakenProcessManager.generate_digest`
+
+        Raises:
+            RateLimited: If the call could not be admitted within the queue timeout.
+
+        Returns:
+            dict: The return value of the base function.
+
+        """
+        await self.acquire()
+        key = (int(time.monotonic() / self.DIGEST_CACHE_INTERVAL), self.process_manager.digest_version)
+        if self.digest_cache is None or self.digest_cache[0] != key:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(None, self.process_manager.generate_digest)
+            future.add_done_callback(self.digest_done)
+            self.digest_cache = (key, future)
+        # Shielded, so a cancelled call does not cancel the digest for the other callers
+        return await asyncio.shield(self.digest_cache[1])
+
+    def digest_done(self, future):
+        """Drops a cached process digest that was cancelled or failed, so the next call retries.
+
+        Args:
+            future (asyncio.Future): The future of the finished digest.
+
+        """
+        if future.cancelled() or future.exception() is not None:
+            if self.digest_cache is not None and self.digest_cache[1] is future:
+                self.digest_cache = None
+
+    @aiomas.expose
+    async def share_generate_digest(self):
+        """Generates a digest containing the available logs and kernel files.
+
+        The digest is cached until the tracked files change, so repeated polling returns the
+        same digest without rebuilding it.
+
+        See Also:
+            :meth:`kraken_tools.kraken_share_manager.KrakenShareManager.generate_digest`
+
+        Raises:
+            RateLimited: If the call could not be admitted within the queue timeout.
+
+        Returns:
+            dict: The return value of the base function.
+
+        """
+        log.debug("%r share generate digest called.", self)
+        await self.acquire()
+        version = self.share_manager.digest_version
+        if self.share_digest_cache is None or self.share_digest_cache[0] != version:
+            self.share_digest_cache = (version, self.share_manager.generate_digest())
+        return self.share_digest_cache[1]
+
+    process_run = expose_delegate("process_manager", KrakenProcessManager, "process_run")
+    process_step = expose_delegate("process_manager", KrakenProcessManager, "process_step")
+    process_pause = expose_delegate("process_manager", KrakenProcessManager, "process_pause")
+    process_no_compute = expose_delegate("process_manager", KrakenProcessManager, "process_no_compute")
+    process_exit = expose_delegate("process_manager", KrakenProcessManager, "process_exit")
+    process_signal = expose_delegate("process_manager", KrakenProcessManager, "process_signal")
+    process_run_async = expose_deferred("process_manager", KrakenProcessManager, "process_run")
+    process_step_async = expose_deferred("process_manager", KrakenProcessManager, "process_step")
+    process_pause_async = expose_deferred("process_manager", KrakenProcessManager, "process_pause")
+    process_no_compute_async = expose_deferred("process_manager", KrakenProcessManager, "process_no_compute")
+    process_exit_async = expose_deferred("process_manager", KrakenProcessManager, "process_exit")
+    process_signal_async = expose_deferred("process_manager", KrakenProcessManager, "process_signal")
+    generate_digest_delta = expose_delegate("process_manager", KrakenProcessManager, "generate_digest_delta", blocking=True)
+    read_log = expose_delegate("share_manager", KrakenShareManager, "read_log", blocking=True)
+    read_log_chunk = expose_delegate("share_manager", KrakenShareManager, "read_log_chunk", blocking=True)
+    read_kernel_info = expose_delegate("share_manager", KrakenShareManager, "read_kernel_info", blocking=True)
@@ -0,0 +1,92 @@
+"""Provides helpers for building agents that expose ``KrakenTools`` methods.
+
+``aiomas.expose`` only marks a function with an ``__rpc__`` attribute and does not wrap it, so 
+exposing a method adds no call frame. The ``aiomas`` router caches the bound method it resolves 
+for each RPC path, so exposed methods are looked up on an agent only once. Agents cannot use 
+``__slots__``, as the router stores its state on the agent instance.
+
+"""
+
+
+import aiomas
+import asyncio
+import functools
+
+
+def expose_delegate(manager, base, name, blocking=False):
+    """Creates an exposed coroutine that calls a method of a manager once the call is admitted.
+
+    The generated coroutine takes the name and docstring of the manager method. It awaits 
+    ``acquire`` on the agent, and returns the value of the manager method. If the call is not 
+    admitted, the ``RateLimited`` exception raised by ``acquire`` is passed on to the caller. The 
+    manager method is looked up once when the coroutine is created.
+
+    Blocking methods are run in the event loop's default executor, so they do not hold up other 
+    RPCs while they run.
+
+    Args:
+        manager (str): The name of the agent attribute holding the manager.
+        base (type): The class of the manager.
+        name (str): The name of the method.
+        blocking (bool, optional): If True, the manager method is run in an executor. Defaults to 
+            False.
+
+    Returns:
+        Callable: The exposed coroutine function.
+
+    """
+    func = getattr(base, name)
+
+    if blocking:
+        @functools.wraps(func)
+        async def method(self, *args, **kwargs):
+            await self.acquire()
+            loop = asyncio.get_running_loop()
+            call = functools.partial(func, getattr(self, manager), *args, **kwargs)
+            return await loop.run_in_executor(None, call)
+    else:
+        @functools.wraps(func)
+        async def method(self, *args, **kwargs):
+            await self.acquire()
+            return func(getattr(self, manager), *args, **kwargs)
+
+    return aiomas.expose(method)
+
+
+def expose_deferred(manager, base, name):
+    """Creates an exposed coroutine that schedules a method of a manager and returns at once.
+
+    The generated coroutine is named after the manager method with an ``_async`` suffix. It awaits 
+    ``acquire`` on the agent and then schedules the manager method to run on the event loop 
+    instead of calling it. The return value of the manager method is discarded, so clients can 
+    send several commands without waiting on their results.
+
+    Args:
+        manager (str): The name of the agent attribute holding the manager.
+        base (type): The class of the manager.
+        name (str): The name of the method.
+
+    Returns:
+        Callable: The exposed coroutine function.
+
+    """
+    func = getattr(base, name)
+
+    async def method(self, *args, **kwargs):
+        await self.acquire()
+        call = functools.partial(func, getattr(self, manager), *args, **kwargs)
+        asyncio.get_running_loop().call_soon(call)
+        return True
+
+    method.__name__ = name + "_async"
+    method.__qualname__ = method.__name__
+    method.__doc__ = """Schedules ``{}.{}`` to run and returns without waiting for it.
+
+        Raises:
+            RateLimited: If the call could not be admitted within the queue timeout.
+
+        Returns:
+            bool: True.
+
+        """.format(base.__name__, name)
+    return aiomas.expose(method)
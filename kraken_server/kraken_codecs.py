@@ -0,0 +1,52 @@
+"""Provides the codecs used to encode and decode RPC messages.
+
+The codecs in this module produce the same wire format as ``aiomas.MsgPack`` and
+``aiomas.MsgPackBlosc``, so clients using the stock ``aiomas`` codecs can still connect.
+
+"""
+
+
+import aiomas
+import blosc
+import msgpack
+
+
+class FastMsgPack(aiomas.codecs.Codec):
+    """A codec using the C accelerated ``msgpack`` module to encode and decode messages.
+
+    Unlike ``aiomas.MsgPack``, strings are decoded with ``raw=False`` rather than the
+    ``encoding`` argument that has been removed from newer ``msgpack`` releases.
+
+    """
+    def encode(self, data):
+        return msgpack.packb(data, default=self.serialize_obj, use_bin_type=True)
+
+    def decode(self, data):
+        return msgpack.unpackb(data, object_hook=self.deserialize_obj, use_list=False, raw=False)
+
+
+class FastMsgPackBlosc(FastMsgPack):
+    """A codec using the C accelerated ``msgpack`` module and blosc compression.
+
+    Messages are compressed using the ``lz4`` compressor with a type size of 1, as msgpack output
+    is a byte stream that does not benefit from the 8 byte shuffle used by ``aiomas.MsgPackBlosc``.
+
+    Messages smaller than ``COMPRESSION_THRESHOLD`` bytes, such as the replies to control RPCs, 
+    are stored in a blosc frame without being compressed. The frame is still decoded by any blosc 
+    codec, so the wire format is unchanged.
+
+    Attributes:
+        COMPRESSION_THRESHOLD (int): Class attribute. The message size in bytes below which 
+            compression is skipped.
+
+    """
+    COMPRESSION_THRESHOLD = 512
+
+    def encode(self, data):
+        packed = FastMsgPack.encode(self, data)
+        if len(packed) < self.COMPRESSION_THRESHOLD:
+            return blosc.compress(packed, typesize=1, clevel=0)
+        return blosc.compress(packed, typesize=1, cname="lz4")
+
+    def decode(self, data):
+        return FastMsgPack.decode(self, blosc.decompress(bytes(data)))
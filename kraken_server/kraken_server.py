@@ -6,8 +6,12 @@
 import aiomas
 import asyncio
 import logging
-from .kraken_process_manager_agent import KrakenProcessManagerAgent
-from .kraken_share_manager_agent import KrakenShareManagerAgent
+from .kraken_agent import KrakenAgent
+from .kraken_codecs import FastMsgPack, FastMsgPackBlosc
+
+
+log = logging.getLogger(__name__)
+
 
 class KrakenServer(object):
     """Allows starting a server to control Kraken processes via ``KrakenTools``.
@@ -15,40 +19,53 @@ class KrakenServer(object):
     The server is started using the ``aiomas`` containers and agents. Msgpack is used for encoding 
     and compression of messages. The server allows RPC requests to be processed and responded to.
 
-    The ``KrakenProcessManagerAgent`` and ``KrakenShareAgent`` are assigned with an index of 0 and 
-    1 in the container respectively.
+    A single ``KrakenAgent`` serving both the process and share managers is assigned with an 
+    index of 0 in the container.
     
     Args:
         host (str, optional): IP address to host the server on.
         port (int, optional): Port to bind the server to.
         rate_limit (float, optional): Interval in seconds to wait per RPC. Set to 0 to disable.
+        burst_capacity (int, optional): Number of RPCs allowed back to back before rate limiting 
+            applies. Defaults to 1.
+        queue_timeout (float, optional): Longest time in seconds an RPC waits for the rate limit 
+            before being rejected. Defaults to 1.0.
         blosc (bool, optional): Indicates whether blosc compression is used for messaging. Must be 
             enabled on both the server and client.
         share_dir (str, optional): Path to the share folder for Kraken. Defaults to /milk/share.
+        share_polling (bool, optional): If True, the share folder is polled for changes. Set to 
+            None to poll only if it is on a network file system. Defaults to None.
+        share_poll_interval (float, optional): Interval in seconds between polls of the share 
+            folder. Defaults to 2.0.
 
     Attributes:
-        log (logging.Logger): The logger object.
         container (aiomas.Container): The container the server agent runs in. 
         host (str): The IP address to host the server on.
         port (int): The port to bind the server to.
         rate_limit (float): Interval in seconds to wait per RPC. Set to 0 to disable.
+        burst_capacity (int): Number of RPCs allowed back to back before rate limiting applies.
+        queue_timeout (float): Longest time in seconds an RPC waits for the rate limit.
         blosc (bool): Indicates whether blosc compression is used for messaging. Must be 
             enabled on both the server and client.
         share_dir (str): Path to the share folder for Kraken.
-        process_agent (KrakenProcessManagerAgent): The process manager agent.
-        share_agent (KrakenShareManagerAgent): The share manager agent.
+        share_polling (bool): If True, the share folder is polled for changes. If None, it is 
+            polled only if it is on a network file system.
+        share_poll_interval (float): Interval in seconds between polls of the share folder.
+        agent (KrakenAgent): The agent serving the process and share managers.
 
     """
-    def __init__(self, host="0.0.0.0", port=20000, rate_limit=0, blosc=True, share_dir="/milk/share"):
-        self.log = logging.getLogger(__file__)
+    def __init__(self, host="0.0.0.0", port=20000, rate_limit=0, blosc=True, share_dir="/milk/share", burst_capacity=1, queue_timeout=1.0, share_polling=None, share_poll_interval=2.0):
         self.container = None
         self.host = host
         self.port = port
         self.rate_limit = rate_limit
+        self.burst_capacity = burst_capacity
+        self.queue_timeout = queue_timeout
         self.blosc = blosc
         self.share_dir = share_dir
-        self.process_agent = None
-        self.share_agent = None
+        self.share_polling = share_polling
+        self.share_poll_interval = share_poll_interval
+        self.agent = None
 
     def start(self):
         """Starts the server.
@@ -62,14 +79,19 @@ class KrakenServer(object):
         if self.container is None:
             self.container = aiomas.Container.create(
                 (self.host, self.port), 
-                codec=aiomas.MsgPack if not self.blosc else aiomas.MsgPackBlosc
+                codec=FastMsgPack if not self.blosc else FastMsgPackBlosc
+            )
+            self.agent = KrakenAgent(
+                self.container, 
+                rate_limit=self.rate_limit, 
+                share_dir=self.share_dir, 
+                burst_capacity=self.burst_capacity, 
+                queue_timeout=self.queue_timeout, 
+                share_polling=self.share_polling, 
+                share_poll_interval=self.share_poll_interval
             )
-            self.process_agent = KrakenProcessManagerAgent(self.container, rate_limit=self.rate_limit)
-            self.process_agent.start_tracking()
-            self.log.info("Started process agent at {}".format(self.process_agent.addr))
-            self.share_agent = KrakenShareManagerAgent(self.container, rate_limit=self.rate_limit, share_dir=self.share_dir)
-            self.share_agent.start_tracking()
-            self.log.info("Started share agent at {}".format(self.share_agent.addr))
+            self.agent.start_tracking()
+            log.info("Started agent at %s", self.agent.addr)
             return True
         return False
 
@@ -83,21 +105,19 @@ class KrakenServer(object):
 
         """
         if self.container is not None:
-            self.process_agent.stop_tracking()
-            self.share_agent.stop_tracking()
-            self.log.info("Cleaning up remaining tasks.")
-            loop = asyncio.get_event_loop()
-            remaining = asyncio.all_tasks(loop)
+            self.agent.stop_tracking()
+            log.info("Cleaning up remaining tasks.")
+            loop = self.container.loop
+            remaining = [task for task in asyncio.all_tasks(loop) if not task.done()]
             for task in remaining:
                 task.cancel()
-            loop.run_until_complete(asyncio.gather(*remaining))
-            self.log.info("Shutting down container.")
+            # Collect cancellations as results so one task cannot abort the cleanup of the rest
+            loop.run_until_complete(asyncio.gather(*remaining, return_exceptions=True))
+            log.info("Shutting down container.")
             self.container.shutdown()
             self.container = None
-            self.log.info("Container shutdown complete.")
-            self.process_agent.dispose()
-            self.process_agent = None
-            self.share_agent.dispose()
-            self.share_agent = None
+            log.info("Container shutdown complete.")
+            self.agent.dispose()
+            self.agent = None
             return True
         return False
@@ -4,15 +4,424 @@ This module holds several classes that allows for asynchronous notifications to
 through the use of ``watchdog``. These notifications trigger callbacks that can be registered 
 on to different change events.
 
+On Linux, events are read straight from an inotify file descriptor by ``_InotifyObserver`` and 
+dispatched to the ``watchdog`` event handlers. The ``watchdog`` observer is only used where 
+inotify is not available.
+
 """
 import time
 import os
 import logging
-import watchdog
+import ctypes
+import ctypes.util
+import select
+import struct
+import threading
+from collections import deque
 from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserverVFS
 from watchdog.events import FileSystemEventHandler
+from watchdog.events import FileCreatedEvent, FileDeletedEvent, DirCreatedEvent, DirDeletedEvent
 from enum import Enum
 
+
+log = logging.getLogger(__name__)
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    _inotify_init1 = _libc.inotify_init1
+    _inotify_add_watch = _libc.inotify_add_watch
+    _inotify_rm_watch = _libc.inotify_rm_watch
+except (OSError, AttributeError):
+    _inotify_init1 = None
+else:
+    _inotify_init1.argtypes = [ctypes.c_int]
+    _inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    _inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+# Event masks from <sys/inotify.h>
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+# The MILK proc directory used when a tracker is not given one
+_MILK_PROC_DEFAULT = os.path.abspath(os.environ.get("MILK_PROC_DIR", "/milk/proc"))
+
+# File systems that inotify does not report remote changes for
+_NETWORK_FS_TYPES = {"nfs", "nfs4", "cifs", "smb3", "smbfs"}
+
+
+def _walk_files(path):
+    """Recursively yields the directory entries of the files in a directory.
+
+    Uses ``os.scandir`` so the file type cached from reading the directory is used instead of a 
+    stat call per entry. Like ``os.walk``, symlinked directories are not followed and directories 
+    that cannot be read are skipped.
+
+    Args:
+        path (str): The directory to walk.
+
+    Yields:
+        os.DirEntry: The entry of each file, holding both its path and its name.
+
+    """
+    try:
+        entries = os.scandir(path)
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    yield from _walk_files(entry.path)
+            else:
+                yield entry
+
+
+def _inotify_error(path=None):
+    """Builds an ``OSError`` from the errno left by a failed inotify call.
+
+    Args:
+        path (str, optional): The path the call was made for.
+
+    Returns:
+        OSError: The error.
+
+    """
+    err = ctypes.get_errno()
+    return OSError(err, os.strerror(err), path)
+
+
+class _InotifyObserver(threading.Thread):
+    """Delivers inotify events to ``watchdog`` event handlers.
+
+    A drop-in replacement for the ``watchdog`` observer on Linux. The observer thread blocks in 
+    ``select`` on the inotify file descriptor, and on each wakeup drains every pending event before 
+    blocking again, dispatching each event as soon as it is read. The ``watchdog`` inotify observer instead holds every event in its ``InotifyBuffer`` for 0.5 s 
+    (``InotifyBuffer.delay``) to pair up moves, and pumps it through a queue to a second thread.
+
+    Moves into and out of a watched directory are dispatched as creations and deletions. When 
+    watching recursively, directories created or moved in are watched as they appear and the 
+    files already inside them are dispatched as created.
+
+    Attributes:
+        fd (int): The inotify file descriptor.
+        watches (dict): Maps each watch descriptor to a tuple of the watched path, its event 
+            handler and whether it is watched recursively.
+        schedules (list): The ``(event_handler, path, recursive)`` tuples to watch when started.
+
+    """
+    _EVENT_FORMAT = "iIII"
+    _EVENT_SIZE = struct.calcsize(_EVENT_FORMAT)
+    _WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+    _READ_SIZE = 65536
+
+    def __init__(self):
+        threading.Thread.__init__(self, name="InotifyObserver")
+        self.fd = _inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise _inotify_error()
+        self._stop_read, self._stop_write = os.pipe()
+        self.watches = {}
+        self.schedules = []
+
+    def schedule(self, event_handler, path, recursive=False):
+        """Schedules a directory to be watched once the observer is started.
+
+        Args:
+            event_handler (FileSystemEventHandler): The handler events are dispatched to.
+            path (str): The directory to watch.
+            recursive (bool, optional): If True, subdirectories are watched too. Defaults to False.
+
+        """
+        self.schedules.append((event_handler, path, recursive))
+
+    def start(self):
+        """Adds the scheduled watches and starts the observer thread.
+
+        Raises:
+            OSError: If a scheduled directory could not be watched.
+
+        """
+        for event_handler, path, recursive in self.schedules:
+            self._watch(path, event_handler, recursive)
+        threading.Thread.start(self)
+
+    def stop(self):
+        """Signals the observer thread to stop. The inotify file descriptor is closed by the thread.
+
+        """
+        os.write(self._stop_write, b"\0")
+
+    def run(self):
+        try:
+            while True:
+                readable, _, _ = select.select([self.fd, self._stop_read], [], [])
+                if self._stop_read in readable:
+                    break
+                # Drain the queue, so a burst of events costs one select
+                while True:
+                    try:
+                        data = os.read(self.fd, self._READ_SIZE)
+                    except BlockingIOError:
+                        break
+                    self._dispatch_events(data)
+        finally:
+            os.close(self.fd)
+            os.close(self._stop_read)
+            os.close(self._stop_write)
+
+    def _watch(self, path, event_handler, recursive):
+        """Adds a watch on a directory, and on its subdirectories if recursive.
+
+        Args:
+            path (str): The directory to watch.
+            event_handler (FileSystemEventHandler): The handler events are dispatched to.
+            recursive (bool): If True, subdirectories are watched too.
+
+        Raises:
+            OSError: If the directory could not be watched.
+
+        """
+        wd = _inotify_add_watch(self.fd, os.fsencode(path), self._WATCH_MASK)
+        if wd < 0:
+            raise _inotify_error(path)
+        self.watches[wd] = (path, event_handler, recursive)
+        if recursive:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        self._watch(entry.path, event_handler, True)
+
+    def _unwatch(self, path):
+        """Removes the watches on a directory and its subdirectories.
+
+        Args:
+            path (str): The directory to stop watching.
+
+        """
+        prefix = path + os.sep
+        for wd, (watched_path, _, _) in list(self.watches.items()):
+            if watched_path == path or watched_path.startswith(prefix):
+                # The kernel follows up with IN_IGNORED, which drops the entry from watches
+                _inotify_rm_watch(self.fd, wd)
+
+    def _dispatch_events(self, data):
+        """Parses the ``inotify_event`` structs read from the file descriptor and dispatches them.
+
+        Args:
+            data (bytes): The bytes read from the inotify file descriptor.
+
+        """
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = struct.unpack_from(self._EVENT_FORMAT, data, offset)
+            offset += self._EVENT_SIZE
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                log.warning("Inotify event queue overflowed, events have been lost.")
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            watch = self.watches.get(wd)
+            if watch is None:
+                continue
+
+            path, event_handler, recursive = watch
+            src_path = os.path.join(path, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    event_handler.dispatch(DirCreatedEvent(src_path))
+                    if recursive:
+                        self._watch_new_tree(src_path, event_handler)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    if recursive:
+                        self._unwatch(src_path)
+                    event_handler.dispatch(DirDeletedEvent(src_path))
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                event_handler.dispatch(FileCreatedEvent(src_path))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                event_handler.dispatch(FileDeletedEvent(src_path))
+
+    def _watch_new_tree(self, path, event_handler):
+        """Watches a directory that appeared inside a recursive watch.
+
+        Files may be created in the directory before its watch is added, so the files already in 
+        it are dispatched as created.
+
+        Args:
+            path (str): The new directory.
+            event_handler (FileSystemEventHandler): The handler events are dispatched to.
+
+        """
+        try:
+            self._watch(path, event_handler, True)
+        except OSError:
+            # Removed again before it could be watched
+            return
+        for entry in _walk_files(path):
+            event_handler.dispatch(FileCreatedEvent(entry.path))
+
+
+def _is_network_fs(path):
+    """Determines whether a path is on a network file system, such as NFS or CIFS.
+
+    The file system type is taken from the most specific mount point in ``/proc/mounts`` that 
+    holds the path.
+
+    Args:
+        path (str): The path to check.
+
+    Returns:
+        bool: True if the path is on a network file system. False if not, or if unknown.
+
+    """
+    path = os.path.realpath(path)
+    mount_point = ""
+    fstype = None
+    try:
+        with open("/proc/mounts") as fp:
+            for line in fp:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount = fields[1].replace("\\040", " ")
+                if (path == mount or path.startswith(mount.rstrip("/") + "/")) and len(mount) >= len(mount_point):
+                    mount_point, fstype = mount, fields[2]
+    except OSError:
+        return False
+    return fstype in _NETWORK_FS_TYPES
+
+
+class _EventDebouncer(object):
+    """Buffers tracker events briefly so that bursts are delivered together.
+
+    Events are held for ``delay`` seconds after the first event of a burst, then delivered in a 
+    single call. A file that is created and deleted again within the same burst is dropped. A file 
+    that is deleted and created again keeps both events, as the new file is a different one.
+
+    Deliveries are serialised by ``dispatch_lock``, so bursts reach ``dispatch`` one at a time and 
+    in the order they occurred, even if a callback outlasts ``delay``.
+
+    Args:
+        dispatch (Callable): Called with the list of buffered events, each a tuple of the 
+            arguments for a tracker's ``event_callback``.
+        created (Enum): The event type for a created file.
+        deleted (Enum): The event type for a deleted file.
+        delay (float, optional): The time in seconds to buffer events for. Set to 0 to deliver 
+            each event immediately. Defaults to 0.01.
+
+    Attributes:
+        dispatch (Callable): Called with the list of buffered events.
+        created (Enum): The event type for a created file.
+        deleted (Enum): The event type for a deleted file.
+        delay (float): The time in seconds to buffer events for.
+        pending (collections.deque): The buffered events.
+        lock (threading.Lock): Guards ``pending`` and ``timer``.
+        dispatch_lock (threading.RLock): Held while taking a burst and delivering it.
+        timer (threading.Timer): The timer that flushes the current burst, or None.
+
+    """
+    def __init__(self, dispatch, created, deleted, delay=0.01):
+        self.dispatch = dispatch
+        self.created = created
+        self.deleted = deleted
+        self.delay = delay
+        self.pending = deque()
+        self.lock = threading.Lock()
+        self.dispatch_lock = threading.RLock()
+        self.timer = None
+
+    def push(self, event):
+        """Buffers an event, starting the flush timer if this is the first event of a burst.
+
+        Args:
+            event (tuple): The arguments for the tracker's ``event_callback``, starting with the 
+                event type and the filename.
+
+        """
+        if self.delay <= 0:
+            with self.dispatch_lock:
+                self.dispatch([event])
+            return
+        with self.lock:
+            self.pending.append(event)
+            if self.timer is None:
+                self.timer = threading.Timer(self.delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        """Delivers the buffered events now.
+
+        """
+        # Taken before the burst, so a later burst cannot be delivered ahead of this one
+        with self.dispatch_lock:
+            with self.lock:
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+                events = list(self.pending)
+                self.pending.clear()
+            events = self.coalesce(events)
+            if events:
+                self.dispatch(events)
+
+    def extend(self, events):
+        """Buffers several events without starting the flush timer.
+
+        Used by a tracker's ``scan``, which flushes straight after, so its events are delivered 
+        in order with the events from the observer.
+
+        Args:
+            events (list): The events, each as passed to ``push``.
+
+        """
+        with self.lock:
+            self.pending.extend(events)
+
+    def coalesce(self, events):
+        """Drops the events of files that were created and deleted again within a burst.
+
+        Args:
+            events (list): The buffered events, in the order they occurred.
+
+        Returns:
+            list: The remaining events, grouped by file in the order each file first occurred.
+
+        """
+        by_file = {}
+        for event in events:
+            file_events = by_file.setdefault(event[1], [])
+            if event[0] == self.deleted and file_events and file_events[-1][0] == self.created:
+                file_events.pop()
+            else:
+                file_events.append(event)
+        return [event for file_events in by_file.values() for event in file_events]
+
+
+def _create_observer():
+    """Creates the observer used by the file trackers.
+
+    Returns:
+        _InotifyObserver: If inotify is available, otherwise a ``watchdog`` ``Observer``.
+
+    """
+    if _inotify_init1 is not None:
+        try:
+            return _InotifyObserver()
+        except OSError as e:
+            log.warning("Inotify unavailable, falling back to watchdog observer. %s", e)
+    return Observer()
+
+
 class MilkProcFileTracker(object):  
     """Tracks file changes in the MILK proc directory.
 
@@ -24,19 +433,37 @@ class MilkProcFileTracker(object):
     
     Args:
         proc_dir (str, optional): The path to the MILK proc directory. Defaults to MILK_PROC_DIR 
-            as specified in environment variables, or ``/milk/proc`` if not specified.
+            as specified in environment variables when the module is imported, or ``/milk/proc`` 
+            if not specified.
         event_callback (Callable, optional): A callback function taking an argument of 
             ``MilkProcFileTracker.Event`` that indicates the type of event that happened.
+        event_callback_batch (Callable, optional): A callback function taking a list of 
+            ``(MilkProcFileTracker.Event, filename)`` tuples. If supplied, it is called once per 
+            burst of events instead of calling ``event_callback`` for each.
+        debounce (float, optional): The time in seconds file events are buffered for, so that a 
+            burst of events is delivered together. Set to 0 to deliver events immediately. 
+            Defaults to 0.01.
     
     Attributes:
-        log (logging.Logger): The logger object.
         event_callback (Callable, optional): If supplied, this callback will be called when files 
             are created or deleted with an argument of ``MilkProcFileTracker.Event``.
+        event_callback_batch (Callable, optional): If supplied, this callback will be called with 
+            a list of ``(MilkProcFileTracker.Event, filename)`` tuples instead of 
+            ``event_callback``.
+        debouncer (_EventDebouncer): Buffers the file events from the observer.
         started (bool): Indicates whether file tracking is active.
         proc_dir (str): The path to the MILK proc directory.
-        files (set): The set of files currently registered in the tracker.
+        files (tuple): Read only. A snapshot of the names of the files currently registered in the 
+            tracker. The tuple is replaced rather than changed, so it can be iterated from any 
+            thread. As all tracked files are in ``proc_dir``, only their names are stored.
+        full_paths (tuple): Read only. The paths of the files currently registered in the 
+            tracker, built from ``files`` on each access.
         event_handler (FileSystemEventHandler): An instance of ``FileSystemEventHandler``.
-        observer (Observer): The ``watchdog`` observer object.
+        observer (Observer): The observer object. An ``_InotifyObserver`` where inotify is 
+            available, otherwise a ``watchdog`` ``Observer``.
+        _TRACKED_PREFIX (str): Class attribute. The prefix of tracked file names.
+        _TRACKED_SUFFIX (str): Class attribute. The suffix of tracked file names.
+        _TRACKED_LENGTH (int): Class attribute. The shortest length of tracked file names.
 
     """
     class Event(Enum):
@@ -46,36 +473,84 @@ class MilkProcFileTracker(object):
         FILE_CREATED = 0
         FILE_DELETED = 1
 
-    def __init__(self, proc_dir=None, event_callback=None,):
-        self.log = logging.getLogger(__file__)
+    _TRACKED_PREFIX = "proc."
+    _TRACKED_SUFFIX = ".shm"
+    _TRACKED_LENGTH = len(_TRACKED_PREFIX) + len(_TRACKED_SUFFIX)
+
+    def __init__(self, proc_dir=None, event_callback=None, event_callback_batch=None, debounce=0.01):
         self.event_callback = event_callback
+        self.event_callback_batch = event_callback_batch
+        self.debouncer = _EventDebouncer(
+            self.dispatch_events, 
+            MilkProcFileTracker.Event.FILE_CREATED, 
+            MilkProcFileTracker.Event.FILE_DELETED, 
+            delay=debounce
+        )
+        # Bound once, as these are called for every file event
+        self._push = self.debouncer.push
         self.started = False
         if proc_dir is None:
-            self.proc_dir = os.path.abspath(os.environ.get("MILK_PROC_DIR", "/milk/proc"))
+            self.proc_dir = _MILK_PROC_DEFAULT
         else:
             self.proc_dir = os.path.abspath(proc_dir)
-        self.log.debug("Milk file tracker set to track {}.".format(self.proc_dir))
-        self.files = set()
+        self._proc_dir_slash = self.proc_dir.rstrip("/") + "/"
+        log.debug("Milk file tracker set to track %s.", self.proc_dir)
+        self._files_set = set()
+        self._files_tuple = ()
+        self._files_lock = threading.Lock()
+        self._files_add = self._files_set.add
+        self._files_remove = self._files_set.remove
         self.event_handler = FileSystemEventHandler()
         self.event_handler.on_created = self.file_created_action
         self.event_handler.on_deleted = self.file_deleted_action
 
-        self.observer = Observer()
+        self.observer = _create_observer()
         self.observer.schedule(self.event_handler, self.proc_dir, recursive=False)
 
-    def is_tracked(self, file):
+    @property
+    def files(self):
+        """tuple: A snapshot of the names of the files currently registered in the tracker.
+
+        """
+        return self._files_tuple
+
+    @property
+    def full_paths(self):
+        """tuple: The paths of the files currently registered in the tracker.
+
+        """
+        proc_dir_slash = self._proc_dir_slash
+        return tuple(proc_dir_slash + name for name in self._files_tuple)
+
+    def is_tracked(self, filename_only):
         """Determines if the file is a MLIK proc shared memory file.
         
         Args:
-            file (str): Filepath of the file.
+            filename_only (str): Name of the file, without its directory.
         
         Returns:
             bool: True if tracked. False if not.
 
         """
-        filename = os.path.basename(file)
-        name, ext = os.path.splitext(filename)
-        return ext == ".shm" and name.find("proc.") == 0
+        # The prefix and suffix must not overlap, so ``proc.shm`` is not tracked
+        return (
+            len(filename_only) >= self._TRACKED_LENGTH 
+            and filename_only.startswith(self._TRACKED_PREFIX) 
+            and filename_only.endswith(self._TRACKED_SUFFIX)
+        )
+
+    def dispatch_events(self, events):
+        """Delivers events to the registered callback.
+
+        Args:
+            events (list): List of ``(MilkProcFileTracker.Event, filename)`` tuples.
+
+        """
+        if self.event_callback_batch is not None:
+            self.event_callback_batch(events)
+        elif self.event_callback is not None:
+            for event_type, filename in events:
+                self.event_callback(event_type, filename)
 
     def file_created_action(self, event):
         """Runs when a file is created in the MILK proc directory.
@@ -89,12 +564,17 @@ class MilkProcFileTracker(object):
 
         """
         filepath = event.src_path
+        name = os.path.basename(filepath)
         
-        if not event.is_directory and self.is_tracked(filepath) and filepath not in self.files:
-            self.log.debug("New tracked file, file {}.".format(filepath))
-            self.files.add(filepath)
-            if self.event_callback is not None:
-                self.event_callback(MilkProcFileTracker.Event.FILE_CREATED, filepath)
+        if not event.is_directory and self.is_tracked(name):
+            with self._files_lock:
+                if name in self._files_set:
+                    return
+                self._files_add(name)
+                self._files_tuple = tuple(self._files_set)
+                # Buffered under the lock, so events are delivered in the order the files changed
+                self._push((_PROC_CREATED, filepath))
+            log.debug("New tracked file, file %s.", filepath)
 
     def file_deleted_action(self, event):
         """Runs when a file is deleted in the MILK proc directory.
@@ -108,12 +588,17 @@ class MilkProcFileTracker(object):
 
         """
         filepath = event.src_path
-
-        if not event.is_directory and self.is_tracked(filepath) and filepath in self.files:
-            self.log.debug("Tracked file deleted, file {}.".format(filepath))
-            self.files.remove(filepath)
-            if self.event_callback is not None:
-                self.event_callback(MilkProcFileTracker.Event.FILE_DELETED, filepath)
+        name = os.path.basename(filepath)
+
+        if not event.is_directory and self.is_tracked(name):
+            with self._files_lock:
+                try:
+                    self._files_remove(name)
+                except KeyError:
+                    return
+                self._files_tuple = tuple(self._files_set)
+                self._push((_PROC_DELETED, filepath))
+            log.debug("Tracked file deleted, file %s.", filepath)
 
     def start(self):
         """Starts file tracking.
@@ -126,10 +611,11 @@ class MilkProcFileTracker(object):
             bool: True if successful, False if not.
             
         """
-        self.log.info("Starting file tracking.")
+        log.info("Starting file tracking.")
         if not self.started:
             self.observer.setDaemon(True)
             self.observer.start()
+            self.started = True
             self.scan()
             return True
         return False
@@ -137,17 +623,20 @@ class MilkProcFileTracker(object):
     def stop(self):
         """Stops file tracking.
 
-        This method will stop the watchdog observer thread. The tracked file list is untouched.
+        This method will stop the watchdog observer thread and deliver any buffered events. The 
+        tracked file list is untouched.
         
         Returns:
             bool: True if successful, False if not.
 
         """
         if self.started:
-            self.log.info("Stopping file tracking.")
+            log.info("Stopping file tracking.")
             self.observer.stop()
             self.observer.join()
-            self.log.info("File tracking stopped.")
+            self.debouncer.flush()
+            self.started = False
+            log.info("File tracking stopped.")
             return True
         return False
 
@@ -164,28 +653,40 @@ class MilkProcFileTracker(object):
             discovered file. Defaults to True.
 
         """
-        self.log.debug("Scanning for new proc files.")
-        new_files = set()
-        for file in os.listdir(self.proc_dir):
-            if self.is_tracked(file):
-                filename = os.path.join(self.proc_dir, file)
-                new_files.add(filename)
-            
-        removed_files = self.files.difference(new_files)
-        added_files = new_files.difference(self.files)
-        self.log.debug("{} files to be removed from current list, {} files to be added.".format(len(removed_files), len(added_files)))
-
-        # Remove from tracked and trigger callbacks
-        for filename in removed_files:
-            self.files.remove(filename)
-            if trigger_callback and self.event_callback is not None:
-                self.event_callback(MilkProcFileTracker.Event.FILE_DELETED, filename)
-
-        # Add to tracked and trigger callbacks
-        for filename in added_files:
-            self.files.add(filename)
-            if trigger_callback and self.event_callback is not None:
-                self.event_callback(MilkProcFileTracker.Event.FILE_CREATED, filename)
+        log.debug("Scanning for new proc files.")
+        discovered = set()
+        added_files = []
+        with self._files_lock:
+            # Add untracked files to tracked in the same pass as the directory is read
+            with os.scandir(self.proc_dir) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if self.is_tracked(name) and not entry.is_dir():
+                        discovered.add(name)
+                        if name not in self._files_set:
+                            self._files_add(name)
+                            added_files.append(entry.path)
+
+            removed_names = [name for name in self._files_set if name not in discovered]
+            for name in removed_names:
+                self._files_remove(name)
+            removed_files = [self._proc_dir_slash + name for name in removed_names]
+            if added_files or removed_names:
+                self._files_tuple = tuple(self._files_set)
+            # Buffered under the lock, after any events for earlier changes
+            if trigger_callback:
+                self.debouncer.extend([(_PROC_DELETED, filename) for filename in removed_files])
+                self.debouncer.extend([(_PROC_CREATED, filename) for filename in added_files])
+        log.debug("%s files to be removed from current list, %s files to be added.", len(removed_files), len(added_files))
+
+        # Deliver the buffered events, ending with the removed then added files of this scan
+        if trigger_callback:
+            self.debouncer.flush()
+
+
+# Module level aliases of the event types, which are looked up faster than the nested enums
+_PROC_CREATED = MilkProcFileTracker.Event.FILE_CREATED
+_PROC_DELETED = MilkProcFileTracker.Event.FILE_DELETED
 
 
 class KrakenShareFileTracker(object):
@@ -197,24 +698,53 @@ class KrakenShareFileTracker(object):
     notifications when events happen in its event handler. This class handles the lifecycle of 
     the watchdog observer and event handler objects.
     
+    Inotify does not report changes made by other hosts on network file systems, so the share 
+    directory can instead be polled with a ``watchdog`` polling observer. Polling is enabled 
+    automatically when the share directory is on an NFS or CIFS mount.
+
     Args:
         share_dir (str, optional): The path to the share directory. Defaults to /milk/share.
         event_callback (Callable, optional): A callback function taking an argument of,
             ``KrakenShareFileTracker.Event`` and ``KrakenShareFileTracker.FileType`` and the 
             filename that indicates the type of event that happened, and whether it is a log or 
             kernel connection file.
+        polling (bool, optional): If True, the share directory is polled for changes. Set to None 
+            to poll only if the share directory is on a network file system. Defaults to None.
+        poll_interval (float, optional): The interval in seconds between polls. Defaults to 2.0.
+        poll_throttle_ms (float, optional): The time in milliseconds to sleep before each 
+            directory is listed while polling. Defaults to 10.
+        event_callback_batch (Callable, optional): A callback function taking a list of 
+            ``(KrakenShareFileTracker.Event, filename, KrakenShareFileTracker.FileType)`` tuples. 
+            If supplied, it is called once per burst of events instead of calling 
+            ``event_callback`` for each.
+        debounce (float, optional): The time in seconds file events are buffered for, so that a 
+            burst of events is delivered together. Set to 0 to deliver events immediately. 
+            Defaults to 0.01.
         
     Attributes:
-        log (logging.Logger): The logger object.
         event_callback (Callable, optional): A callback function taking an argument of,
             ``KrakenShareFileTracker.Event`` and ``KrakenShareFileTracker.FileType`` and the 
             filename that indicates the type of event that happened, and whether it is a log or 
             kernel connection file.
+        event_callback_batch (Callable, optional): If supplied, this callback will be called with 
+            a list of ``(KrakenShareFileTracker.Event, filename, KrakenShareFileTracker.FileType)`` 
+            tuples instead of ``event_callback``.
+        debouncer (_EventDebouncer): Buffers the file events from the observer.
         started (bool): Indicates whether file tracking is active.
         share_dir (str): The path to the share directory.
-        files (set): The set of files currently registered in the tracker.
+        polling (bool): Indicates whether the share directory is polled for changes.
+        poll_interval (float): The interval in seconds between polls.
+        poll_throttle_ms (float): The time in milliseconds to sleep before each directory is 
+            listed while polling. Can be changed while tracking to tune the polling load.
+        log_files (dict): The log files currently registered in the tracker, mapped to the scan 
+            generation they were last seen in. Use ``log_files.keys()`` for a set-like view.
+        kernel_files (dict): The kernel files currently registered in the tracker, mapped to the 
+            scan generation they were last seen in. Use ``kernel_files.keys()`` for a set-like 
+            view.
         event_handler (FileSystemEventHandler): An instance of ``FileSystemEventHandler``.
-        observer (Observer): The ``watchdog`` observer object.
+        observer (Observer): The observer object. A ``watchdog`` polling observer if polling, 
+            otherwise an ``_InotifyObserver`` where inotify is available, or a ``watchdog`` 
+            ``Observer``.
 
     """
     class Event(Enum):
@@ -232,82 +762,160 @@ class KrakenShareFileTracker(object):
         LOG = 0
         KERNEL = 1
 
-    def __init__(self, share_dir="/milk/share", event_callback=None):
-        self.log = logging.getLogger(__file__)
+    # Maps the (extension, prefix) of a tracked file name to its file type and tracking dict
+    _DISPATCH = {
+        (".txt", "log."): (FileType.LOG, "log_files"),
+        (".json", "kernel."): (FileType.KERNEL, "kernel_files")
+    }
+
+    def __init__(self, share_dir="/milk/share", event_callback=None, polling=None, poll_interval=2.0, poll_throttle_ms=10, event_callback_batch=None, debounce=0.01):
         self.event_callback = event_callback
+        self.event_callback_batch = event_callback_batch
+        self.debouncer = _EventDebouncer(
+            self.dispatch_events, 
+            KrakenShareFileTracker.Event.FILE_CREATED, 
+            KrakenShareFileTracker.Event.FILE_DELETED, 
+            delay=debounce
+        )
+        # Bound once, as these are called for every file event
+        self._push = self.debouncer.push
         self.started = False
         self.share_dir = os.path.abspath(share_dir)
-        self.log.debug("Share file tracker set to track {}.".format(self.share_dir))
-        self.log_files = set()
-        self.kernel_files = set()
+        log.debug("Share file tracker set to track %s.", self.share_dir)
+        self.log_files = {}
+        self.kernel_files = {}
+        self._gen = 0
+        self._files_lock = threading.Lock()
         self.event_handler = FileSystemEventHandler()
-        self.event_handler.on_any_event = self.file_event_action
-        self.observer = Observer()
+        self.event_handler.on_created = self.file_created_action
+        self.event_handler.on_deleted = self.file_deleted_action
+        if polling is None:
+            polling = _is_network_fs(self.share_dir)
+        self.polling = polling
+        self.poll_interval = poll_interval
+        self.poll_throttle_ms = poll_throttle_ms
+        if polling:
+            log.info("Polling %s every %s s.", self.share_dir, poll_interval)
+            self.observer = PollingObserverVFS(os.stat, self.throttled_listdir, polling_interval=poll_interval)
+        else:
+            self.observer = _create_observer()
         self.observer.schedule(self.event_handler, self.share_dir, recursive=True)
 
-    def filetype(self, file):
+    def throttled_listdir(self, path):
+        """Lists a directory after sleeping for ``poll_throttle_ms``.
+
+        Used by the polling observer to list each directory, spreading the work of a poll out so 
+        it does not take a core while walking a large share directory.
+
+        Args:
+            path (str): The directory to list.
+
+        Returns:
+            list: The names of the entries in the directory.
+
+        """
+        if self.poll_throttle_ms > 0:
+            time.sleep(self.poll_throttle_ms / 1000)
+        return os.listdir(path)
+
+    def filetype(self, filename_only):
         """Determines the filetype of the file.
         
         Args:
-            file (str): Filepath of the file.
+            filename_only (str): Name of the file, without its directory.
         
         Returns:
             KrakenShareFileTracker.FileType: The file type or False if not tracked. 
 
         """
-        filename = os.path.basename(file)
-        name, ext = os.path.splitext(filename)
+        dispatch = self._classify(filename_only)
+        if dispatch is None:
+            return False
+        return dispatch[0]
 
-        if name.startswith("log.") and ext == ".txt":
-            return KrakenShareFileTracker.FileType.LOG
-        elif name.startswith("kernel.") and ext == ".json":
-            return KrakenShareFileTracker.FileType.KERNEL
-        return False
+    def _classify(self, filename_only):
+        """Looks up the file type and tracking dict of a file.
+
+        Args:
+            filename_only (str): Name of the file, without its directory.
+
+        Returns:
+            tuple: The ``KrakenShareFileTracker.FileType`` and the name of the attribute holding 
+                the files of that type, or None if not tracked.
+
+        """
+        prefix = filename_only.split(".", 1)[0] + "."
+        ext = filename_only[filename_only.rfind("."):]
+        # The prefix and extension must not overlap, so ``log.txt`` is not tracked
+        if len(filename_only) < len(prefix) + len(ext):
+            return None
+        return self._DISPATCH.get((ext, prefix))
 
-    def file_event_action(self, event):
-        """Runs when a change occurs in the share folder.
+    def dispatch_events(self, events):
+        """Delivers events to the registered callback.
+
+        Args:
+            events (list): List of ``(KrakenShareFileTracker.Event, filename, 
+                KrakenShareFileTracker.FileType)`` tuples.
 
-        This callback method should override ``on_any_event`` on a ``FileSystemEventHandler``. 
-        This method will activate the callback assigned to this class and update the log files set 
-        provided that the event type is accepted and the filetype is valid.
+        """
+        if self.event_callback_batch is not None:
+            self.event_callback_batch(events)
+        elif self.event_callback is not None:
+            for event_type, filename, filetype in events:
+                self.event_callback(event_type, filename, filetype)
+
+    def file_created_action(self, event):
+        """Runs when a file is created in the share folder.
+
+        This callback method should override ``on_created`` on a ``FileSystemEventHandler``. 
+        This method will activate the callback assigned to this class and add the file to the 
+        tracked files of its type, provided that the filetype is valid and it is not yet tracked.
         
         Args:
-            filename (str): The filename of the created file.
+            event (watchdog.events.FileSystemEvent): The event.
 
         """
+        if event.is_directory:
+            return
         filepath = event.src_path
+        dispatch = self._classify(os.path.basename(filepath))
+        if dispatch is None:
+            return
+        filetype, which = dispatch
+        files = getattr(self, which)
+        with self._files_lock:
+            if filepath in files:
+                return
+            files[filepath] = self._gen
+            # Buffered under the lock, so events are delivered in the order the files changed
+            self._push((_SHARE_CREATED, filepath, filetype))
+        log.debug("New tracked file, file %s.", filepath)
 
-        if not event.is_directory:
-            filetype = self.filetype(filepath)
-            if filetype is not None:
-                event_accepted = False
-                if event.event_type == watchdog.events.EVENT_TYPE_CREATED:
-                    self.log.debug("New tracked file, file {}.".format(filepath))
-                    event_type = KrakenShareFileTracker.Event.FILE_CREATED
-                    if filetype == KrakenShareFileTracker.FileType.KERNEL:
-                        self.kernel_files.add(filepath)
-                        event_accepted = True
-                    elif filetype == KrakenShareFileTracker.FileType.LOG:
-                        self.log_files.add(filepath)
-                        event_accepted = True
-                elif event.event_type == watchdog.events.EVENT_TYPE_DELETED:
-                    self.log.debug("Tracked file deleted, file {}.".format(filepath))
-                    event_type = KrakenShareFileTracker.Event.FILE_DELETED
-                    if filetype == KrakenShareFileTracker.FileType.KERNEL and filepath in self.kernel_files:
-                        self.kernel_files.remove(filepath)
-                        event_accepted = True
-                    elif filetype == KrakenShareFileTracker.FileType.LOG and filepath in self.log_files:
-                        self.log_files.remove(filepath)
-                        event_accepted = True
-                # elif event.event_type == watchdog.events.EVENT_TYPE_MODIFIED:
-                #     self.log.debug("Tracked file modified, file {}.".format(filepath))
-                #     event_type = KrakenShareFileTracker.Event.FILE_MODIFIED
-                #     if filetype == KrakenShareFileTracker.FileType.KERNEL and filepath in self.kernel_files:
-                #         event_accepted = True
-                #     elif filetype == KrakenShareFileTracker.FileType.LOG and filepath in self.log_files:
-                #         event_accepted = True
-                if event_accepted and self.event_callback is not None:
-                    self.event_callback(event_type, filepath, filetype)
+    def file_deleted_action(self, event):
+        """Runs when a file is deleted in the share folder.
+
+        This callback method should override ``on_deleted`` on a ``FileSystemEventHandler``. 
+        This method will activate the callback assigned to this class and remove the file from the 
+        tracked files of its type, provided that it is tracked.
+        
+        Args:
+            event (watchdog.events.FileSystemEvent): The event.
+
+        """
+        if event.is_directory:
+            return
+        filepath = event.src_path
+        dispatch = self._classify(os.path.basename(filepath))
+        if dispatch is None:
+            return
+        filetype, which = dispatch
+        files = getattr(self, which)
+        with self._files_lock:
+            if files.pop(filepath, None) is None:
+                return
+            self._push((_SHARE_DELETED, filepath, filetype))
+        log.debug("Tracked file deleted, file %s.", filepath)
 
     def start(self):
         """Starts file tracking.
@@ -320,10 +928,11 @@ class KrakenShareFileTracker(object):
             bool: True if successful, False if not.
             
         """
-        self.log.info("Starting file tracking.")
+        log.info("Starting file tracking.")
         if not self.started:
             self.observer.setDaemon(True)
             self.observer.start()
+            self.started = True
             self.scan()
             return True
         return False
@@ -331,17 +940,20 @@ class KrakenShareFileTracker(object):
     def stop(self):
         """Stops file tracking.
 
-        This method will stop the watchdog observer thread. The tracked file list is untouched.
+        This method will stop the watchdog observer thread and deliver any buffered events. The 
+        tracked file list is untouched.
         
         Returns:
             bool: True if successful, False if not.
 
         """
         if self.started:
-            self.log.info("Stopping file tracking.")
+            log.info("Stopping file tracking.")
             self.observer.stop()
             self.observer.join()
-            self.log.info("File tracking stopped.")
+            self.debouncer.flush()
+            self.started = False
+            log.info("File tracking stopped.")
             return True
         return False
 
@@ -352,50 +964,60 @@ class KrakenShareFileTracker(object):
         files will be added to tracked and trigger the callback if enabled. Tracked files that 
         are no longer present will be removed from the tracked list and trigger the callback if 
         enabled. This method does NOT check for file modifications.
+
+        Each scan stamps the files it finds with a new generation, so the files that were not 
+        found are those left with an older generation.
         
         Args:
             trigger_callback (bool, optional): If True, will run the ``event_callback`` for each 
             discovered file. Defaults to True.
 
         """
-        self.log.debug("Scanning for new share files.")
-        new_log_files = set()
-        new_kernel_files = set()
-
-        files = [os.path.join(self.share_dir, dp, f) 
-                    for dp, dn, fn in os.walk(self.share_dir) 
-                        for f in fn]
-        
-        for file in files:
-            filetype = self.filetype(file)
-            if filetype == KrakenShareFileTracker.FileType.KERNEL:
-                new_kernel_files.add(file)
-            elif filetype == KrakenShareFileTracker.FileType.LOG:
-                new_log_files.add(file)
-            
-        removed_log_files = self.log_files.difference(new_log_files)
-        added_log_files = new_log_files.difference(self.log_files)
-        self.log.debug("{} files to be removed from current log file list, {} files to be added.".format(len(removed_log_files), len(added_log_files)))
-        removed_kernel_files = self.kernel_files.difference(new_kernel_files)
-        added_kernel_files = new_kernel_files.difference(self.kernel_files)
-        self.log.debug("{} files to be removed from current kernel file list, {} files to be added.".format(len(removed_kernel_files), len(added_kernel_files)))
-
-        # Remove from tracked and trigger callbacks
-        for file_type, remove_list, files_set in [
-            (KrakenShareFileTracker.FileType.LOG, removed_log_files, self.log_files), 
-            (KrakenShareFileTracker.FileType.KERNEL, removed_kernel_files, self.kernel_files)
-        ]:
-            for filename in remove_list:
-                files_set.remove(filename)
-                if trigger_callback and self.event_callback is not None:
-                    self.event_callback(KrakenShareFileTracker.Event.FILE_DELETED, filename, file_type)
-
-        # Add to tracked and trigger callbacks
-        for file_type, add_list, files_set in [
-            (KrakenShareFileTracker.FileType.LOG, added_log_files, self.log_files), 
-            (KrakenShareFileTracker.FileType.KERNEL, added_kernel_files, self.kernel_files)
-        ]:
-            for filename in add_list:
-                files_set.add(filename)
-                if trigger_callback and self.event_callback is not None:
-                    self.event_callback(KrakenShareFileTracker.Event.FILE_CREATED, filename, file_type)
+        log.debug("Scanning for new share files.")
+        added_files = []
+        removed_files = []
+        # Held for the whole scan, as the observer adds and removes files while it runs
+        with self._files_lock:
+            self._gen += 1
+            gen = self._gen
+            # Add untracked files to tracked in the same pass as the directory is walked
+            for entry in _walk_files(self.share_dir):
+                dispatch = self._classify(entry.name)
+                if dispatch is None:
+                    continue
+                filetype, which = dispatch
+                files = getattr(self, which)
+                filename = entry.path
+                if filename not in files:
+                    added_files.append((filetype, filename))
+                files[filename] = gen
+
+            # Remove files left with an older generation from tracked
+            for file_type, files in (
+                (KrakenShareFileTracker.FileType.LOG, self.log_files), 
+                (KrakenShareFileTracker.FileType.KERNEL, self.kernel_files)
+            ):
+                stale = [filename for filename, file_gen in files.items() if file_gen != gen]
+                for filename in stale:
+                    del files[filename]
+                removed_files.extend((file_type, filename) for filename in stale)
+
+            # Buffered under the lock, after any events for earlier changes
+            if trigger_callback:
+                self.debouncer.extend([
+                    (_SHARE_DELETED, filename, file_type) 
+                    for file_type, filename in removed_files
+                ])
+                self.debouncer.extend([
+                    (_SHARE_CREATED, filename, file_type) 
+                    for file_type, filename in added_files
+                ])
+        log.debug("%s files to be removed from current share file lists, %s files to be added.", len(removed_files), len(added_files))
+
+        # Deliver the buffered events, ending with the removed then added files of this scan
+        if trigger_callback:
+            self.debouncer.flush()
+
+
+_SHARE_CREATED = KrakenShareFileTracker.Event.FILE_CREATED
+_SHARE_DELETED = KrakenShareFileTracker.Event.FILE_DELETED
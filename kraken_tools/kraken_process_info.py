@@ -12,7 +12,198 @@ import signal
 from enum import Enum
 import logging
 import psutil
-from threading import Timer, Thread
+import time
+import ctypes
+import selectors
+from threading import Event, Lock, Thread, current_thread
+
+
+log = logging.getLogger(__name__)
+
+
+# pidfd_open is syscall 434 on all architectures, available from Linux 5.3
+_SYS_PIDFD_OPEN = 434
+
+try:
+    _syscall = ctypes.CDLL(None, use_errno=True).syscall
+except (OSError, AttributeError):
+    _syscall = None
+
+
+def _pidfd_open(pid):
+    """Opens a file descriptor referring to a process, which becomes readable when it exits.
+
+    Args:
+        pid (int): The process ID.
+
+    Raises:
+        OSError: If the file descriptor could not be opened, such as on kernels before 5.3.
+
+    Returns:
+        int: The file descriptor.
+
+    """
+    if hasattr(os, "pidfd_open"):
+        return os.pidfd_open(pid)
+    if _syscall is None:
+        raise OSError("pidfd_open is not available.")
+    fd = _syscall(_SYS_PIDFD_OPEN, ctypes.c_int(pid), ctypes.c_uint(0))
+    if fd < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+    return fd
+
+
+class _ExitWatcher(object):
+    """Closes linked ``KrakenProcessInfo`` instances when their processes exit.
+
+    A pidfd is opened for each watched process and registered with a single epoll selector, so one 
+    thread waits on all processes instead of one blocked thread per process. The thread is started 
+    when the first process is watched.
+
+    Attributes:
+        selector (selectors.BaseSelector): The selector the pidfds are registered with.
+        fds (dict): Maps each watched instance to its pidfd.
+        lock (threading.Lock): Guards ``fds`` and ``thread``.
+        thread (threading.Thread): The waiting thread, or None if not started.
+
+    """
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.fds = {}
+        self.lock = Lock()
+        self.thread = None
+
+    def watch(self, instance):
+        """Starts waiting for the process of an instance to exit.
+
+        Args:
+            instance (KrakenProcessInfo): The linked instance.
+
+        Raises:
+            OSError: If a pidfd could not be opened for the process.
+
+        """
+        fd = _pidfd_open(instance.PID)
+        with self.lock:
+            self.fds[instance] = fd
+            self.selector.register(fd, selectors.EVENT_READ, instance)
+            if self.thread is None:
+                self.thread = Thread(target=self.run, name="KrakenProcessExitWatcher", daemon=True)
+                self.thread.start()
+
+    def unwatch(self, instance):
+        """Stops waiting for the process of an instance and closes its pidfd.
+
+        Args:
+            instance (KrakenProcessInfo): The instance.
+
+        """
+        with self.lock:
+            fd = self.fds.pop(instance, None)
+            if fd is None:
+                return
+            self.selector.unregister(fd)
+        os.close(fd)
+
+    def run(self):
+        """Waits for watched processes to exit and closes their instances.
+
+        """
+        while True:
+            for key, _ in self.selector.select():
+                instance = key.data
+                # Guarded, as this thread handles the exits of every process
+                try:
+                    # The pidfd stays readable, so it is dropped before the instance is closed
+                    self.unwatch(instance)
+                    log.info("Process %s has ended.", instance.proc_file)
+                    instance.close()
+                except Exception:
+                    log.exception("Failed to close the exited process %s.", instance.proc_file)
+
+
+_exit_watcher = _ExitWatcher()
+
+
+class _MonitorRegistry(object):
+    """Polls the psutil stats of all linked ``KrakenProcessInfo`` instances from a single thread.
+
+    The thread is started when the first instance is registered and exits once none are left, so 
+    a single wake-up per interval serves every tracked process. Between polls the thread waits on 
+    an event rather than sleeping, so it exits as soon as the last instance is deregistered.
+
+    Args:
+        interval (float, optional): The interval in seconds between polls. Defaults to 1.
+
+    Attributes:
+        interval (float): The interval in seconds between polls.
+        instances (set): The registered ``KrakenProcessInfo`` instances.
+        lock (threading.Lock): Guards ``instances`` and ``thread``.
+        thread (threading.Thread): The polling thread, or None if not running.
+        wakeup (threading.Event): Set to end the current wait between polls early.
+
+    """
+    def __init__(self, interval=1):
+        self.interval = interval
+        self.instances = set()
+        self.lock = Lock()
+        self.thread = None
+        self.wakeup = Event()
+
+    def register(self, instance):
+        """Adds an instance to be polled, starting the polling thread if needed.
+
+        Args:
+            instance (KrakenProcessInfo): The instance to poll.
+
+        """
+        with self.lock:
+            self.instances.add(instance)
+            if self.thread is None:
+                self.thread = Thread(target=self.run, name="KrakenProcessMonitor", daemon=True)
+                self.thread.start()
+
+    def deregister(self, instance):
+        """Stops polling an instance.
+
+        Args:
+            instance (KrakenProcessInfo): The instance to stop polling.
+
+        """
+        with self.lock:
+            self.instances.discard(instance)
+            if not self.instances:
+                self.wakeup.set()
+
+    def run(self):
+        """Polls the registered instances once per interval until none are left.
+
+        """
+        try:
+            while True:
+                start = time.monotonic()
+                with self.lock:
+                    self.wakeup.clear()
+                    if not self.instances:
+                        self.thread = None
+                        return
+                    instances = list(self.instances)
+                for instance in instances:
+                    # Guarded, as one failing process must not stop the polling of the others
+                    try:
+                        instance._poll_once()
+                    except Exception:
+                        log.exception("Failed to poll process %s.", instance.proc_file)
+                self.wakeup.wait(max(0, self.interval - (time.monotonic() - start)))
+        finally:
+            # Lets register start a new thread if this one ended unexpectedly
+            with self.lock:
+                if self.thread is current_thread():
+                    self.thread = None
+
+
+_monitor = _MonitorRegistry()
 
 
 class KrakenProcessInfo(CacaoProcessTools.processinfo):
@@ -26,9 +217,8 @@ class KrakenProcessInfo(CacaoProcessTools.processinfo):
         proc_file (str): Filepath of the proc shm file to link.
 
     Attributes:
-        props (list): Class attribute. This is a list of properties available for the process. Some 
+        props (tuple): Class attribute. This is a tuple of properties available for the process. Some 
             properties listed may be generated from methods instead.
-        log (logging.Logger): The logger object.
         linked (bool): Indicates whether the instance is linked to a shm file.
         cpu (float): The cpu utilisation in %. Is the same as top's display divided by number of 
             CPUs.
@@ -36,14 +226,20 @@ class KrakenProcessInfo(CacaoProcessTools.processinfo):
         cpu_affinity (list): List of integers indicating the process's cpu affinities.
         cpu_count (int): The number of CPUs of this machine.
         ps (psutil.Process): The process object from psutil.
-        monitoring_frequency (float): The interval for polling psutil for the process stats.
         cpu_context_switches (int): The total number of context switches performed.
         thread_count (int): The number of threads currently used by the process.
-        monitoring_timer (threading.Timer): The timer running psutil monitoring.
+        wait_thread (threading.Thread): The thread waiting for the process to exit, only used 
+            where a pidfd cannot be opened for the process. None otherwise.
+        AFFINITY_POLL_TICKS (int): Class attribute. The number of monitoring ticks between reads 
+            of the cpu affinity, as it rarely changes.
+        _STATIC_PROPS (tuple): Class attribute. The properties from ``props`` that do not change 
+            while the instance is linked.
+        _VOLATILE_PROPS (tuple): Class attribute. The remaining properties from ``props``, which 
+            must be read again whenever they are reported.
         proc_file (str): The filepath of the linked shm file.
 
     """
-    props = [
+    props = (
         "PID",
         "name",
         "cpu",
@@ -60,20 +256,43 @@ class KrakenProcessInfo(CacaoProcessTools.processinfo):
         "description",
         "get_creation_time",
         "get_status"
-    ]
+    )
+
+    _STATIC_PROPS = (
+        "PID",
+        "name",
+        "tmuxname",
+        "description",
+        "get_creation_time"
+    )
+
+    _VOLATILE_PROPS = (
+        "cpu",
+        "memory",
+        "cpu_affinity",
+        "cpu_context_switches",
+        "thread_count",
+        "loopcnt",
+        "CTRLval",
+        "loopstat",
+        "statuscode",
+        "statusmsg",
+        "get_status"
+    )
+
+    AFFINITY_POLL_TICKS = 10
 
     def __init__(self, proc_file=None):
-        self.log = logging.getLogger(__file__)
         self.linked = False
         self.cpu = 0.0
         self.memory = 0
         self.cpu_affinity = []
         self.cpu_count = psutil.cpu_count()
         self.ps = None
-        self.monitoring_frequency = 1
         self.cpu_context_switches = 0
         self.thread_count = 0
-        self.monitoring_timer = None
+        self._affinity_tick = 0
+        self.wait_thread = None
         if proc_file is not None:
             if self.check_link(proc_file):
                 self.link(proc_file)
@@ -82,6 +301,19 @@ class KrakenProcessInfo(CacaoProcessTools.processinfo):
                 raise ValueError("Invalid arguments to create class.")
         self.proc_file = proc_file
 
+    @classmethod
+    def _is_method(cls, prop):
+        """Checks whether a property listed in ``props`` is a method that generates its value.
+
+        Args:
+            prop (str): The property name.
+
+        Returns:
+            bool: True if the property is a method, False if it is a value.
+
+        """
+        return callable(getattr(cls, prop, None))
+
     def check_link(self, file):
         """Checks for if the file is a valid filepath.
 
@@ -103,16 +335,18 @@ class KrakenProcessInfo(CacaoProcessTools.processinfo):
     def wait_task(self):
         """Waits until the process dies and unlinks the shm file automatically.
 
+        Only used where the shared exit watcher cannot open a pidfd for the process.
+
         """
         if self.linked and self.ps is not None:
             self.ps.wait()
-            self.log.info("Process {} has ended.".format(self.proc_file))
+            log.info("Process %s has ended.", self.proc_file)
             self.close()
 
     def link(self, file):
         """Performs the linking to a proc shm file.
 
-        Starts the monitoring and wait threads.
+        Registers the instance for psutil monitoring and to be closed when the process exits.
         
         Args:
             file (str): Filepath to a proc shm file.
@@ -133,34 +367,35 @@ class KrakenProcessInfo(CacaoProcessTools.processinfo):
             self.proc_file = file
             try:
                 self.ps = psutil.Process(self.PID)
-                self.wait_thread = Thread(target=self.wait_task, daemon=True)
-                self.wait_thread.start()
-                self.monitoring_timer = Timer(self.monitoring_frequency, self.monitoring_handler)
-                self.monitoring_timer.setDaemon(True)
-                self.monitoring_timer.start()
+                try:
+                    _exit_watcher.watch(self)
+                except OSError as error:
+                    log.debug("Waiting for exit on a thread, pidfd unavailable: %s", error)
+                    self.wait_thread = Thread(target=self.wait_task, daemon=True)
+                    self.wait_thread.start()
+                _monitor.register(self)
             except (psutil.NoSuchProcess, psutil.ZombieProcess) as error:
-                self.log.debug("Error ignored in linking: {}".format(error))
-            self.log.debug("{} linked {}.".format(repr(self), file))
+                log.debug("Error ignored in linking: %s", error)
+            log.debug("%r linked %s.", self, file)
             return True
         return False
 
     def close(self):
         """Closes the linked shm file.
 
-        This method uses ``CacaoProcessTools.processinfo`` to unlink the shm file. All monitoring 
-        and other threads are stopped.
+        This method uses ``CacaoProcessTools.processinfo`` to unlink the shm file. The instance is 
+        no longer monitored.
         
         Returns:
             bool: True if successful. False if not.
 
         """
         if self.linked:
-            if self.monitoring_timer is not None:
-                self.monitoring_timer.cancel()
+            _monitor.deregister(self)
+            _exit_watcher.unwatch(self)
             super().close("")
-            self.log.debug("{} closed {}.".format(repr(self), self.proc_file))
+            log.debug("%r closed %s.", self, self.proc_file)
             self.proc_file = None
-            self.monitoring_timer = None
             self.wait_thread = None
             self.cpu = 0.0
             self.memory = 0.0
@@ -179,10 +414,10 @@ class KrakenProcessInfo(CacaoProcessTools.processinfo):
         """
         if self.linked and self.ps is not None:
             try:
-                self.log.debug("{} sending {}".format(repr(self), signal))
+                log.debug("%r sending %s", self, signal)
                 return self.ps.send_signal(signal)
-            except psutil.NoSuchProcess as error:
-                self.log.debug("Error ignored in signal: {}".format(error))
+            except (psutil.NoSuchProcess, psutil.AccessDenied) as error:
+                log.debug("Error ignored in signal: %s", error)
         return False
 
     def get_creation_time(self):
@@ -194,7 +429,9 @@ class KrakenProcessInfo(CacaoProcessTools.processinfo):
             int: The creation time in nanoseconds since epoch.
 
         """
-        return int(str(self.createtime.tv_sec) + "{0:09d}".format(self.createtime.tv_nsec))
+        createtime = self.createtime
+        assert createtime.tv_nsec < 1000000000
+        return int(createtime.tv_sec) * 1000000000 + int(createtime.tv_nsec)
 
     def get_status(self):
         """Gets the process status.
@@ -206,17 +443,18 @@ class KrakenProcessInfo(CacaoProcessTools.processinfo):
         if self.linked and self.ps is not None:
             try:
                 return self.ps.status()
-            except (KeyError, AttributeError, psutil.NoSuchProcess) as error:
+            except (KeyError, AttributeError, psutil.NoSuchProcess, psutil.AccessDenied) as error:
                 # Keyerror and AttributeError is exempt due to 
                 # some psutil issue when disconnecting on client
-                self.log.debug("Error ignored in get_status: {}".format(error))
+                log.debug("Error ignored in get_status: %s", error)
         return psutil.STATUS_DEAD
 
-    def monitoring_handler(self):
+    def _poll_once(self):
         """Performs the gathering of psutil data.
 
         The ``ps.oneshot`` context manager is used to speed up psutil data gathering. This is 
-        intended to run as a polling method.
+        called by the shared monitor thread once per interval. Monitoring stops once the process 
+        no longer exists.
 
         """
         if self.linked and self.ps is not None:
@@ -224,13 +462,15 @@ class KrakenProcessInfo(CacaoProcessTools.processinfo):
                 with self.ps.oneshot():
                     self.cpu = self.ps.cpu_percent() / self.cpu_count
                     self.memory = self.ps.memory_info().rss
-                    self.cpu_affinity = self.ps.cpu_affinity()
+                    if self._affinity_tick % self.AFFINITY_POLL_TICKS == 0:
+                        self.cpu_affinity = self.ps.cpu_affinity()
+                    self._affinity_tick += 1
                     self.thread_count = self.ps.num_threads()
-                    self.cpu_context_switches = sum(self.ps.num_ctx_switches()) # This is a tuple (voluntary_switches, involuntary_switches)
-                self.monitoring_timer = Timer(self.monitoring_frequency, self.monitoring_handler)
-                self.monitoring_timer.start()
-            except (psutil.NoSuchProcess, psutil.ZombieProcess) as error:
-                self.log.debug("Error ignored in monitoring handler: {}".format(error))
+                    ctx_switches = self.ps.num_ctx_switches() # This is a tuple (voluntary_switches, involuntary_switches)
+                    self.cpu_context_switches = ctx_switches[0] + ctx_switches[1]
+            except (psutil.NoSuchProcess, psutil.ZombieProcess, psutil.AccessDenied) as error:
+                _monitor.deregister(self)
+                log.debug("Error ignored in monitoring handler: %s", error)
 
     def set_cpu_affinity(self, cpus):
         """Sets the cpu affinity for this process.
@@ -245,8 +485,9 @@ class KrakenProcessInfo(CacaoProcessTools.processinfo):
         if self.linked and self.ps is not None:
             try:
                 self.ps.cpu_affinity(cpus)
+                self.cpu_affinity = list(cpus)
                 return True
-            except (psutil.NoSuchProcess, psutil.ZombieProcess) as error:
-                self.log.debug("Error ignored in set_cpu_affinity: {}".format(error))
+            except (psutil.NoSuchProcess, psutil.ZombieProcess, psutil.AccessDenied) as error:
+                log.debug("Error ignored in set_cpu_affinity: %s", error)
         return False
         
@@ -8,28 +8,103 @@ Todo:
 
 import CacaoProcessTools as cpt
 import os
+import sys
 import logging
 from .file_trackers import MilkProcFileTracker
 from .kraken_process_info import KrakenProcessInfo
 from .kraken_process_code import KrakenProcessCode
 import bisect
 import time
+import uuid
+from collections import deque
+from threading import Lock
+from operator import attrgetter, methodcaller
 # import nvsmi
 
 
+log = logging.getLogger(__name__)
+
+
+# Mapping KrakenProcessInfo's info_props to the following
+_PROCESS_INFO_COLUMNS = (
+    "pid", 
+    "name",
+    "cpu",
+    "memory",
+    "cpuAffinity",
+    "cpuContextSwitches",
+    "threadCount",
+    "loopCount", 
+    "control", 
+    "tmuxSession", 
+    "loopStat",  # Does not work as advertised
+    "statusCode",  # Does not work as advertised
+    "message",
+    "description",
+    "creationTime",
+    "status"
+)
+
+# The getter for each column, in column order. Methods are called by the getter.
+_DIGEST_PLAN = tuple(
+    (column, methodcaller(prop) if KrakenProcessInfo._is_method(prop) else attrgetter(prop))
+    for column, prop in zip(_PROCESS_INFO_COLUMNS, KrakenProcessInfo.props)
+)
+
+# The columns read once when a process is linked, and those read on every digest
+_STATIC_PLAN = tuple(
+    step for step, prop in zip(_DIGEST_PLAN, KrakenProcessInfo.props)
+    if prop in KrakenProcessInfo._STATIC_PROPS
+)
+_VOLATILE_PLAN = tuple(
+    step for step, prop in zip(_DIGEST_PLAN, KrakenProcessInfo.props)
+    if prop in KrakenProcessInfo._VOLATILE_PROPS
+)
+
+
 class KrakenProcessManager(object):
     """Allows tracking and reporting of Kraken processes.
     
     Attributes:
-        log (logging.Logger): The logger object.
         process_info_keys (list): The sorted keys for processes stored in process_info dict.
+        process_info_index (tuple): Snapshot of ``process_info_keys`` used as the digest index. 
+            Rebuilt only when processes are added or removed.
+        digest_version (int): Incremented whenever processes are added or removed, or their 
+            control values are changed. Can be used to tell whether a previously generated digest 
+            is still current, apart from its live statistics.
         tracker (MilkProcFileTracker): The file tracker for the MILK proc directory.
+        static_rows (dict): The static columns of the digest row for each process, read when the 
+            process is linked. Keyed by proc filename.
+        DELTA_HISTORY (int): Class attribute. The number of delta digests for which removed 
+            processes are remembered. Older ``since_seq`` values are answered with a full digest.
+        delta_epoch (str): A token unique to this manager instance. Sequence numbers are only 
+            comparable within one epoch, so a ``since_seq`` from an earlier server run is never 
+            mistaken for one from this run.
+        delta_seq (int): The sequence number of the last delta digest.
+        delta_horizon (int): The oldest ``since_seq`` a delta digest can be generated from.
+        delta_cells (dict): The last reported value of each column of each process, with the 
+            sequence number it changed at. Keyed by proc filename, then by column.
+        delta_added (dict): The sequence number each process was first reported at.
+        delta_removed (collections.deque): The ``(seq, filename)`` pairs of processes removed 
+            within the last ``DELTA_HISTORY`` delta digests.
+        delta_lock (threading.Lock): Lock held while generating a delta digest.
 
     """
+    DELTA_HISTORY = 64
+
     def __init__(self):
-        self.log = logging.getLogger(__file__)
         self.process_info_keys = []
+        self.process_info_index = ()
         self.process_info = {}
+        self.digest_version = 0
+        self.static_rows = {}
+        self.delta_epoch = uuid.uuid4().hex
+        self.delta_seq = 0
+        self.delta_horizon = 0
+        self.delta_cells = {}
+        self.delta_added = {}
+        self.delta_removed = deque()
+        self.delta_lock = Lock()
         self.tracker = MilkProcFileTracker(event_callback=self.proc_file_event)
 
     def dispose(self):
@@ -73,33 +148,41 @@ class KrakenProcessManager(object):
 
         """
         if event == MilkProcFileTracker.Event.FILE_CREATED:
-            self.log.info("File created event received by {}. File: {}".format(repr(self), filename))
+            log.info("File created event received by %r. File: %s", self, filename)
             if filename not in self.process_info:
+                # Share one string object between the dict, the sorted keys and every digest index
+                filename = sys.intern(filename)
                 try:
                     info = KrakenProcessInfo(filename)
+                    self.static_rows[filename] = {column: getter(info) for column, getter in _STATIC_PLAN}
                     self.process_info[filename] = info
                     # Insert the key into the sorted list
                     bisect.insort_right(self.process_info_keys, filename)
-                    self.log.debug("Created new KrakenProcessInfo for {}.".format(filename))
+                    self.process_info_index = tuple(self.process_info_keys)
+                    self.digest_version += 1
+                    log.debug("Created new KrakenProcessInfo for %s.", filename)
                 except ValueError as error:
-                    self.log.exception("Failed to create new KrakenProcessInfo for {}. {}.".format(filename, error))
+                    log.exception("Failed to create new KrakenProcessInfo for %s. %s.", filename, error)
                 
         elif event == MilkProcFileTracker.Event.FILE_DELETED:
-            self.log.info("File deleted event received by {}. File: {}".format(repr(self), filename))
+            log.info("File deleted event received by %r. File: %s", self, filename)
             if filename in self.process_info:
                 del self.process_info[filename]
+                del self.static_rows[filename]
                 self.process_info_keys.remove(filename)
-                self.log.debug("Removed KrakenProcessInfo for {}.".format(filename))
+                self.process_info_index = tuple(self.process_info_keys)
+                self.digest_version += 1
+                log.debug("Removed KrakenProcessInfo for %s.", filename)
 
     def list_proc_files(self):
         """List the currently tracked files.
         
         Returns:
-            set: The tracked files. 
+            set: A copy of the tracked files. 
 
         """
-        self.log.debug("Listing proc files.")
-        return self.tracker.files.copy()
+        log.debug("Listing proc files.")
+        return set(self.tracker.full_paths)
 
     def remove_proc_file(self, filename):
         """Removes a proc file from the filesystem.
@@ -114,10 +197,10 @@ class KrakenProcessManager(object):
         self.process_info[filename].close()
         try:
             os.remove(filename)
-            self.log.debug("Removed proc file {}.".format(filename))
+            log.debug("Removed proc file %s.", filename)
             return True
         except OSError as error:
-            self.log.exception("Unable to remove proc file {}. {}.".format(filename, error))
+            log.exception("Unable to remove proc file %s. %s.", filename, error)
         return False
 
     def generate_digest(self):
@@ -149,52 +232,133 @@ class KrakenProcessManager(object):
                 "status"
             ]
 
-        If properties are updated on ``KrakenProcessInfo``, this must be changed.
+        If properties are updated on ``KrakenProcessInfo``, ``_PROCESS_INFO_COLUMNS`` must be changed.
         
         Returns:
             dict: The digest.
         """
         t1 = time.perf_counter()
-        digest_index = self.process_info_keys.copy()
-
-        # Mapping KrakenProcessInfo's info_props to the following
-        process_info_columns = [
-            "pid", 
-            "name",
-            "cpu",
-            "memory",
-            "cpuAffinity",
-            "cpuContextSwitches",
-            "threadCount",
-            "loopCount", 
-            "control", 
-            "tmuxSession", 
-            "loopStat",  # Does not work as advertised
-            "statusCode",  # Does not work as advertised
-            "message",
-            "description",
-            "creationTime",
-            "status"
-        ]
-
-        digest_columns = process_info_columns
+        # Immutable, so it can be shared between digests without a copy
+        digest_index = self.process_info_index
 
         digest = {
             "index": digest_index,
-            "columns": digest_columns,
+            "columns": _PROCESS_INFO_COLUMNS,
             "data" : {}
         }
 
+        data = digest["data"]
+        process_info = self.process_info
+        static_rows = self.static_rows
         for index in digest_index:
-            digest["data"][index] = {}
-            for column, prop in zip(process_info_columns, KrakenProcessInfo.props):
-                value = getattr(self.process_info[index], prop)
-                digest["data"][index][column] = value() if callable(value) else value
+            pinfo = process_info[index]
+            row = static_rows[index].copy()
+            for column, getter in _VOLATILE_PLAN:
+                row[column] = getter(pinfo)
+            data[index] = row
 
         t2 = time.perf_counter()
-        self.log.debug("Digest generated in {} seconds.".format(t2 - t1))
+        log.debug("Digest generated in %s seconds.", t2 - t1)
         return digest
 
+    def generate_digest_delta(self, since_seq=None, epoch=None):
+        """Generates a digest of the changes to the tracked processes since an earlier digest.
+
+        Each call refreshes all processes as ``generate_digest`` does, and is given the next 
+        sequence number. Passing the ``seq`` and ``epoch`` of a previous delta digest as 
+        ``since_seq`` and ``epoch`` returns only the processes added, the processes removed and the 
+        columns changed since that digest. A client applies ``removed``, then ``added``, then 
+        ``changed`` to its copy of the rows.
+
+        If ``since_seq`` is None, too old or unknown to generate a delta from, or ``epoch`` is not 
+        this manager's ``delta_epoch`` (e.g. the server has restarted), every process is reported 
+        in ``added`` and ``full`` is True. The client should then discard its rows.
+
+        .. code-block:: python
+
+            {
+                "epoch": "5f0c...",
+                "seq": 12,
+                "full": False,
+                "index": ("/milk/proc/proc.a.shm", ...),  # All tracked filenames, sorted
+                "columns": ("pid", "name", ...),
+                "added": {filename: {column: value, ...}, ...},  # Complete rows
+                "removed": [filename, ...],
+                "changed": {filename: {column: value, ...}, ...}  # Changed columns only
+            }
+
+        Args:
+            since_seq (int, optional): The ``seq`` of the delta digest the client last applied. 
+                Defaults to None.
+            epoch (str, optional): The ``epoch`` of the delta digest the client last applied. 
+                Defaults to None.
+
+        Returns:
+            dict: The delta digest.
+
+        """
+        digest = self.generate_digest()
+        data = digest["data"]
+        with self.delta_lock:
+            seq = self.delta_seq + 1
+            full = (
+                since_seq is None 
+                or epoch != self.delta_epoch 
+                or not self.delta_horizon <= since_seq <= self.delta_seq
+            )
+            cells = self.delta_cells
+            added = self.delta_added
+            removed = self.delta_removed
+
+            for filename in [filename for filename in cells if filename not in data]:
+                del cells[filename]
+                del added[filename]
+                removed.append((seq, filename))
+
+            for filename, row in data.items():
+                row_cells = cells.get(filename)
+                if row_cells is None:
+                    cells[filename] = {column: (value, seq) for column, value in row.items()}
+                    added[filename] = seq
+                    continue
+                for column, value in row.items():
+                    if row_cells[column][0] != value:
+                        row_cells[column] = (value, seq)
+
+            # Forget removals that are too old to be asked about
+            self.delta_horizon = max(self.delta_horizon, seq - self.DELTA_HISTORY)
+            while removed and removed[0][0] <= self.delta_horizon:
+                removed.popleft()
+            self.delta_seq = seq
+
+            delta = {
+                "epoch": self.delta_epoch,
+                "seq": seq,
+                "full": full,
+                "index": digest["index"],
+                "columns": digest["columns"],
+                "added": {},
+                "removed": [],
+                "changed": {}
+            }
+            if full:
+                delta["added"] = data
+                return delta
+
+            delta["removed"] = [filename for removed_seq, filename in removed if removed_seq > since_seq]
+            for filename, row in data.items():
+                if added[filename] > since_seq:
+                    delta["added"][filename] = row
+                    continue
+                changes = {
+                    column: value 
+                    for column, (value, changed_seq) in cells[filename].items() 
+                    if changed_seq > since_seq
+                }
+                if changes:
+                    delta["changed"][filename] = changes
+            return delta
+
     # def generate_gpu_processes_digest(self):
     #     nvsmi_props = [
     #         "gpu_name",
@@ -289,21 +453,39 @@ class KrakenProcessManager(object):
         # sprintf(syscommand, "clear; tail -f %s", procinfoproc.pinfoarray[pindex]->logfilename);
         raise NotImplementedError()
 
-    def process_run(self, filenames):
-        """Changes the control value for the processes to ``KrakenProcessCode.Control.RUNNING``.
+    def process_set_control(self, control, filenames):
+        """Changes the control value for the processes.
 
         Args:
+            control (int): The ``KrakenProcessCode.Control`` value to set.
             filenames (list): List of linked shm filepaths.
+
+        Raises:
+            ValueError: If the control value is not a ``KrakenProcessCode.Control`` value.
         
         Returns:
             bool: True.
 
         """
+        control = KrakenProcessCode.Control(control)
         for filename in filenames:
-            self.process_info[filename].CTRLval = KrakenProcessCode.Control.RUNNING.value
-            self.log.debug("Set CTRLval for {} to RUNNING".format(filename))
+            self.process_info[filename].CTRLval = control.value
+            log.debug("Set CTRLval for %s to %s.", filename, control.name)
+        self.digest_version += 1
         return True
 
+    def process_run(self, filenames):
+        """Changes the control value for the processes to ``KrakenProcessCode.Control.RUNNING``.
+
+        Args:
+            filenames (list): List of linked shm filepaths.
+        
+        Returns:
+            bool: True.
+
+        """
+        return self.process_set_control(KrakenProcessCode.Control.RUNNING.value, filenames)
+
     def process_step(self, filenames):
         """Changes the control value for the processes to ``KrakenProcessCode.Control.STEP``.
 
@@ -314,10 +496,7 @@ class KrakenProcessManager(object):
             bool: True.
             
         """
-        for filename in filenames:
-            self.process_info[filename].CTRLval = KrakenProcessCode.Control.STEP.value
-            self.log.debug("Set CTRLval for {} to STEP.".format(filename))
-        return True
+        return self.process_set_control(KrakenProcessCode.Control.STEP.value, filenames)
             
     def process_pause(self, filenames):
         """Changes the control value for the processes to ``KrakenProcessCode.Control.PAUSED``.
@@ -329,10 +508,7 @@ class KrakenProcessManager(object):
             bool: True.
             
         """
-        for filename in filenames:
-            self.process_info[filename].CTRLval = KrakenProcessCode.Control.PAUSED.value
-            self.log.debug("Set CTRLval for {} to PAUSED.".format(filename))
-        return True
+        return self.process_set_control(KrakenProcessCode.Control.PAUSED.value, filenames)
             
     def process_no_compute(self, filenames):
         """Changes the control value for the processes to ``KrakenProcessCode.Control.NO_COMPUTE``.
@@ -344,10 +520,7 @@ class KrakenProcessManager(object):
             bool: True.
             
         """
-        for filename in filenames:
-            self.process_info[filename].CTRLval = KrakenProcessCode.Control.NO_COMPUTE.value
-            self.log.debug("Set CTRLval for {} to NO_COMPUTE.".format(filename))
-        return True
+        return self.process_set_control(KrakenProcessCode.Control.NO_COMPUTE.value, filenames)
 
     def process_exit(self, filenames):
         """Changes the control value for the processes to ``KrakenProcessCode.Control.EXIT``.
@@ -362,10 +535,7 @@ class KrakenProcessManager(object):
             bool: True.
             
         """
-        for filename in filenames:
-            self.process_info[filename].CTRLval = KrakenProcessCode.Control.EXIT.value
-            self.log.debug("Set CTRLval for {} to EXIT.".format(filename))
-        return True
+        return self.process_set_control(KrakenProcessCode.Control.EXIT.value, filenames)
 
     def process_signal(self, signal, filenames):
         """Sends a signal to the processes.
@@ -380,6 +550,6 @@ class KrakenProcessManager(object):
         """
         results = []
         for filename in filenames:
-            self.log.debug("Sending signal {} to {}.".format(signal, filename))
+            log.debug("Sending signal %s to %s.", signal, filename)
             results.append(self.process_info[filename].signal(signal))
         return results
@@ -7,36 +7,73 @@ The Kraken share folder includes logs and kernel connection files.
 
 import os
 import logging
+from threading import Lock
+from collections import OrderedDict
 from .file_trackers import KrakenShareFileTracker
 import bisect
 import time
 
 
+log = logging.getLogger(__name__)
+
+
 class KrakenShareManager(object):
     """Allows tracking and reporting of Kraken share functionality.
 
     Args:
         share_dir (str, optional): The filepath to the share folder.
+        polling (bool, optional): If True, the share folder is polled for changes instead of 
+            watched. Set to None to poll only if it is on a network file system. Defaults to None.
+        poll_interval (float, optional): The interval in seconds between polls. Defaults to 2.0.
     
     Attributes:
-        log (logging.Logger): The logger object.
-        log_files (list): List of sorted log filepaths.
-        kernel_files (list): List of sorted kernel filepaths.
+        log_files (tuple): Snapshot of the sorted log filepaths. Replaced, never changed in place, 
+            so it can be read from any thread.
+        kernel_files (tuple): Snapshot of the sorted kernel filepaths. Replaced, never changed in 
+            place, so it can be read from any thread.
+        log_files_sorted (list): The sorted log filepaths. Only changed and read by the 
+            file event callback, which publishes ``log_files``.
+        kernel_files_sorted (list): The sorted kernel filepaths. Only changed and read by 
+            the file event callback, which publishes ``kernel_files``.
+        digest_version (int): Incremented whenever the tracked files change. Can be used to tell 
+            whether a previously generated digest is still current.
         tracker (KrakenShareFileTracker): The file tracker for the share directory.
+        log_fds (collections.OrderedDict): Open file descriptors of recently read tracked log 
+            files, keyed by filepath in least recently used order. Closed when the log file is 
+            deleted or when evicted.
+        log_fds_lock (threading.Lock): Lock held while looking up, adding or closing the cached 
+            file descriptors, as logs are read from executor threads.
+        LOG_FDS_MAX (int): Class attribute. The most log file descriptors kept open in 
+            ``log_fds``.
 
     """
-    def __init__(self, share_dir="/milk/share"):
-        self.log = logging.getLogger(__file__)
-        self.log_files = []
-        self.kernel_files = []
-        self.tracker = KrakenShareFileTracker(event_callback=self.share_file_event, share_dir=share_dir)
+    LOG_FDS_MAX = 64
+
+    def __init__(self, share_dir="/milk/share", polling=None, poll_interval=2.0):
+        self.log_files = ()
+        self.kernel_files = ()
+        self.log_files_sorted = []
+        self.kernel_files_sorted = []
+        self.digest_version = 0
+        self.log_fds = OrderedDict()
+        self.log_fds_lock = Lock()
+        self.tracker = KrakenShareFileTracker(
+            event_callback=self.share_file_event, 
+            share_dir=share_dir, 
+            polling=polling, 
+            poll_interval=poll_interval
+        )
 
     def dispose(self):
-        """Performs the shutdown sequence.
+        """Performs the shutdown sequence and releases file handles.
 
         """
         self.stop_tracking()
         self.tracker = None
+        with self.log_fds_lock:
+            for fd in self.log_fds.values():
+                os.close(fd)
+            self.log_fds.clear()
 
     def start_tracking(self):
         """Starts the tracker.
@@ -69,17 +106,26 @@ class KrakenShareManager(object):
 
         """
         if event == KrakenShareFileTracker.Event.FILE_CREATED:
-            self.log.info("File created event received by {}. File: {}".format(repr(self), filename))
+            log.info("File created event received by %r. File: %s", self, filename)
             if filetype == KrakenShareFileTracker.FileType.KERNEL:
-                bisect.insort_right(self.kernel_files, filename)
+                bisect.insort_right(self.kernel_files_sorted, filename)
+                self.kernel_files = tuple(self.kernel_files_sorted)
             elif filetype == KrakenShareFileTracker.FileType.LOG:
-                bisect.insort_right(self.log_files, filename)
+                bisect.insort_right(self.log_files_sorted, filename)
+                self.log_files = tuple(self.log_files_sorted)
         elif event == KrakenShareFileTracker.Event.FILE_DELETED:
-            self.log.info("File deleted event received by {}. File: {}".format(repr(self), filename))
+            log.info("File deleted event received by %r. File: %s", self, filename)
             if filetype == KrakenShareFileTracker.FileType.KERNEL:
-                self.kernel_files.remove(filename)
+                self.kernel_files_sorted.remove(filename)
+                self.kernel_files = tuple(self.kernel_files_sorted)
             elif filetype == KrakenShareFileTracker.FileType.LOG:
-                self.log_files.remove(filename)
+                self.log_files_sorted.remove(filename)
+                self.log_files = tuple(self.log_files_sorted)
+                with self.log_fds_lock:
+                    fd = self.log_fds.pop(filename, None)
+                    if fd is not None:
+                        os.close(fd)
+        self.digest_version += 1
 
     def generate_digest(self):
         """Generate a digest containing a list of the log files and kernel files.
@@ -89,12 +135,15 @@ class KrakenShareManager(object):
 
         """
         return {
-            "logFiles": self.log_files.copy(),
-            "kernelFiles": self.kernel_files.copy()
+            "logFiles": self.log_files,
+            "kernelFiles": self.kernel_files
         }
 
     def read_log(self, log_file, from_byte=0, to_byte=None):
         """Reads the log file.
+
+        Recently read tracked log files are kept open between calls, so repeated reads of the same 
+        log skip the path lookup and only need a stat and a positional read.
         
         Args:
             log_file (str): Filepath of the log file.
@@ -106,23 +155,75 @@ class KrakenShareManager(object):
             (int, bytes): Tuple of filesize and the byte string.
 
         """
-        filesize = os.path.getsize(log_file)
-        if filesize == 0:
-            return b""
-        
-        if to_byte is None or to_byte > filesize:
-            to_byte = filesize
+        # Each read uses its own duplicate, so the cached descriptor can be closed mid-read
+        with self.log_fds_lock:
+            fd = self.log_fds.get(log_file)
+            if fd is not None:
+                self.log_fds.move_to_end(log_file)
+                fd = os.dup(fd)
+
+        if fd is None:
+            fd = os.open(log_file, os.O_RDONLY | os.O_CLOEXEC)
+            with self.log_fds_lock:
+                # Only tracked logs are kept open, as they are closed on their deletion event
+                log_files = self.log_files
+                position = bisect.bisect_left(log_files, log_file)
+                tracked = position < len(log_files) and log_files[position] == log_file
+                if tracked and log_file not in self.log_fds:
+                    self.log_fds[log_file] = os.dup(fd)
+                    if len(self.log_fds) > self.LOG_FDS_MAX:
+                        _, evicted = self.log_fds.popitem(last=False)
+                        os.close(evicted)
+
+        try:
+            filesize = os.fstat(fd).st_size
+            if filesize == 0:
+                return b""
 
-        with open(log_file, "rb") as fp:
-            if from_byte > 0:
-                fp.seek(from_byte)
-            readsize = to_byte - from_byte
+            if to_byte is None or to_byte > filesize:
+                to_byte = filesize
 
+            readsize = to_byte - from_byte
             if readsize <= 0:
                 return b""
-            
-            data = fp.read(readsize)
-            return data
+
+            return os.pread(fd, readsize, from_byte)
+        finally:
+            os.close(fd)
+
+    def read_log_chunk(self, log_file, from_byte=0, to_byte=None, chunk_size=65536):
+        """Reads one chunk of the log file.
+
+        Used to page through a large range of a log with bounded replies. Each call reads at most 
+        ``chunk_size`` bytes from ``from_byte``, and returns the offset to pass as ``from_byte`` on 
+        the next call. The range has been read once the offset reaches ``to_byte`` or the filesize.
+
+        Args:
+            log_file (str): Filepath of the log file.
+            from_byte (int, optional): Read from specified byte. Defaults to 0.
+            to_byte (int, optional): Read up to the specified byte. Set to None to read to end.
+                Defaults to None.
+            chunk_size (int, optional): The maximum size of the chunk in bytes. Defaults to 65536.
+
+        Returns:
+            (int, int, bytes): Tuple of the offset of the next chunk, the filesize and the byte 
+                string.
+
+        """
+        fd = os.open(log_file, os.O_RDONLY | os.O_CLOEXEC)
+        try:
+            filesize = os.fstat(fd).st_size
+            if to_byte is None or to_byte > filesize:
+                to_byte = filesize
+
+            readsize = min(chunk_size, to_byte - from_byte)
+            if readsize <= 0:
+                return from_byte, filesize, b""
+
+            chunk = os.pread(fd, readsize, from_byte)
+            return from_byte + len(chunk), filesize, chunk
+        finally:
+            os.close(fd)
 
     def read_kernel_info(self, kernel_file):
         """Reads the kernel file.
@@ -134,6 +235,6 @@ class KrakenShareManager(object):
             (int, bytes): Tuple of filesize and the byte string.
 
         """
-        with open(kernel_file, "rb") as fp:
-            data = fp.read()
-            return data
+        # Unbuffered, so the file is read straight into the returned bytes in a single read
+        with open(kernel_file, "rb", buffering=0) as fp:
+            return fp.readall()
@@ -20,20 +20,30 @@ import logging
 import psutil
 import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 if __name__ == "__main__":
     # Parse arguments
     parser = argparse.ArgumentParser(description="Kraken RPC Server - Serve statistics on Kraken monitored processes.")
     parser.add_argument("-p", "--port", default=20000, type=int, help="Specify RPC server port. Defaults to 20000.")
     parser.add_argument("-a", "--address", default="0.0.0.0", type=str, help="Specify RPC server bind address. Defaults to '0.0.0.0'.")
-    parser.add_argument("-r", "--real-time", default=[], type=int, nargs="+", help="Specify list of CPUs to run on (e.g. -r 0 2 3). Defaults to all.")
+    parser.add_argument("-r", "--real-time", default=[], type=int, nargs="+", help="Specify list of CPUs to run on (e.g. -r 0 2 3). Also sets the SCHED_FIFO scheduling policy if permitted. Defaults to all.")
     parser.add_argument("-l", "--rate-limit", default=0, type=float, help="Limit the frequency of calls to this server (e.g. Max 1 call per 0.1s). Defaults to 0.")
+    parser.add_argument("--burst-capacity", default=1, type=int, help="Number of calls allowed back to back before rate limiting applies. Defaults to 1.")
+    parser.add_argument("--queue-timeout", default=1.0, type=float, help="Longest time in seconds a call waits for the rate limit before being rejected. Defaults to 1.0.")
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable logging (logging.INFO).")
     parser.add_argument("-vv", "--extra-verbose", action="store_true", help="Enable debug logging (logging.DEBUG).")
     parser.add_argument("-q", "--quiet", action="store_true", help="Disable logging (logging.CRITICAL).")
     parser.add_argument("-b", "--no-blosc", action="store_true", help="Disable blosc compression for data transport.")
     parser.add_argument("--log-file", default=None, type=str, help="Specify a log file to stream logging data.")
     parser.add_argument("--share-dir", default="/milk/share", type=str, help="Specify the share directory to track logs and kernel files.")
+    parser.add_argument("--share-polling", default="auto", choices=["auto", "on", "off"], help="Poll the share directory for changes instead of watching it. Needed for network file systems. Defaults to 'auto', which polls NFS and CIFS mounts.")
+    parser.add_argument("--share-poll-interval", default=2.0, type=float, help="Interval in seconds between polls of the share directory. Defaults to 2.0.")
     args = parser.parse_args()
 
     # Setup logging
@@ -57,16 +67,29 @@ if __name__ == "__main__":
 
     # Set real-time CPU affinity if enabled
     if len(args.real_time) > 0:
-        log.info("Real time mode enabled, CPU affinity set to {}".format(args.real_time))
+        log.info("Real time mode enabled, CPU affinity set to %s", args.real_time)
         process = psutil.Process()
         process.cpu_affinity(args.real_time)
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(50))
+            log.info("Scheduling policy set to SCHED_FIFO")
+        except OSError as error:
+            log.warning("Unable to set SCHED_FIFO scheduling policy, continuing with the default. %s", error)
     
+    # Use uvloop for the event loop if it is installed, must be set before the server creates it
+    if uvloop is not None:
+        log.info("Using uvloop event loop.")
+        uvloop.install()
+
     # Start the KrakenServer
-    server = KrakenServer(args.address, args.port, rate_limit=args.rate_limit, blosc=not args.no_blosc, share_dir=args.share_dir)
+    share_polling = {"auto": None, "on": True, "off": False}[args.share_polling]
+    server = KrakenServer(args.address, args.port, rate_limit=args.rate_limit, blosc=not args.no_blosc, share_dir=args.share_dir, burst_capacity=args.burst_capacity, queue_timeout=args.queue_timeout, share_polling=share_polling, share_poll_interval=args.share_poll_interval)
     server.start()
 
     # Run the asyncio event loop
     loop = asyncio.get_event_loop()
+    # Size blocking calls' executor to the CPUs this process may run on
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=len(psutil.Process().cpu_affinity())))
 
     try:
         loop.run_forever()